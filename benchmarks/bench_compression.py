@@ -0,0 +1,141 @@
+"""
+Benchmark of Namespace(compress=True, compress_threshold=...) against a
+local stand-in for elasticsearch, measuring bytes on the wire and the
+client cpu time of a mix of index, _bulk and _search requests. The
+stand-in runs in it's own process, so that it's cpu time isn't
+accounted to the client. Doesn't need a running elasticsearch.
+
+    python benchmarks/bench_compression.py
+"""
+import gzip
+import http.server
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                os.pardir)))
+
+from elastic_connect.namespace import Namespace  # noqa: E402
+
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do '
+         'eiusmod tempor incididunt ut labore et dolore magna aliqua').split()
+
+
+def make_doc(i):
+    return {'title': ' '.join(random.choice(WORDS) for _ in range(6)),
+            'body': ' '.join(random.choice(WORDS) for _ in range(60)),
+            'category': random.choice(['news', 'sport', 'culture']),
+            'views': i,
+            'created': '2020-01-01T00:00:%02d' % (i % 60)}
+
+
+def make_search_response(size):
+    hits = [{'_index': 'bench', '_type': 'bench', '_id': str(i),
+             '_score': 1.0, '_source': make_doc(i)} for i in range(size)]
+    return {'took': 1, 'timed_out': False,
+            'hits': {'total': size, 'max_score': 1.0, 'hits': hits}}
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wire = {'sent': 0, 'received': 0}
+    search_response = None
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, data):
+        body = json.dumps(data).encode('utf-8')
+        headers = {'content-type': 'application/json'}
+        if 'gzip' in self.headers.get('accept-encoding', ''):
+            body = gzip.compress(body, compresslevel=1)
+            headers['content-encoding'] = 'gzip'
+        headers['content-length'] = str(len(body))
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.wire['sent'] += len(body)
+
+    def _read(self):
+        body = self.rfile.read(int(self.headers.get('content-length', 0)))
+        self.wire['received'] += len(body)
+        if self.headers.get('content-encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return body
+
+    def do_GET(self):
+        self._read()
+        if self.path.startswith('/_wire'):
+            self._respond(dict(self.wire))
+            self.wire.update(sent=0, received=0)
+        else:
+            self._respond(self.search_response)
+
+    def do_POST(self):
+        body = self._read()
+        if '_bulk' in self.path:
+            count = body.count(b'\n') // 2
+            self._respond({'took': 1, 'errors': False, 'items': [
+                {'index': {'_id': str(i), 'status': 201}}
+                for i in range(count)]})
+        elif '_search' in self.path:
+            self._respond(self.search_response)
+        else:
+            self._respond({'_id': '1', 'result': 'created'})
+
+    do_PUT = do_POST
+
+
+def serve(port):
+    random.seed(1)
+    StandInHandler.search_response = make_search_response(100)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port),
+                                             StandInHandler)
+    server.serve_forever()
+
+
+def run(es, bulk_body, docs):
+    for doc in docs:
+        es.index(index='bench', doc_type='bench', body=doc)
+    for _ in range(5):
+        es.bulk(body=bulk_body)
+    for _ in range(20):
+        es.search(index='bench', body={'query': {'match_all': {}}})
+
+
+def bench(name, port, bulk_body, docs, **options):
+    namespace = Namespace('bench', [{'host': '127.0.0.1', 'port': port}],
+                          **options)
+    es = namespace.get_es()
+    es.transport.perform_request('GET', '/_wire')
+    start = time.process_time()
+    run(es, bulk_body, docs)
+    cpu = time.process_time() - start
+    wire = es.transport.perform_request('GET', '/_wire')
+    print("%-16s %10d B sent %10d B received %8.3f s cpu" %
+          (name, wire['received'], wire['sent'], cpu))
+
+
+if __name__ == '__main__':
+    port = 9299
+    server = multiprocessing.Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    time.sleep(0.5)
+
+    random.seed(2)
+    docs = [make_doc(i) for i in range(50)]
+    bulk_body = ''.join('{"index": {"_index": "bench", "_type": "bench"}}\n'
+                        '%s\n' % json.dumps(make_doc(i))
+                        for i in range(500))
+
+    bench('uncompressed', port, bulk_body, docs)
+    for threshold in (0, 256, 1024, 16384):
+        bench('threshold %s' % threshold, port, bulk_body, docs,
+              compress=True, compress_threshold=threshold)
+    server.terminate()
@@ -0,0 +1,78 @@
+"""
+Microbenchmark of Model.from_es, comparing hydration through __init__
+with the compiled hydrator. Doesn't need a running elasticsearch.
+
+    python benchmarks/bench_from_es.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                os.pardir)))
+
+from elastic_connect import Model  # noqa: E402
+from elastic_connect.data_types import Keyword, Text, Integer, Date, \
+    SingleJoin, MultiJoin  # noqa: E402
+
+
+class Article(Model):
+    __slots__ = ('title', 'body', 'category', 'views', 'author', 'tags',
+                 'created')
+
+    _meta = {
+        '_doc_type': 'bench_article'
+    }
+    _mapping = {
+        'id': Keyword(name='id'),
+        'title': Text(name='title'),
+        'body': Text(name='body'),
+        'category': Keyword(name='category'),
+        'views': Integer(name='views'),
+        'author': SingleJoin(name='author', source='bench_from_es.Article',
+                             target='bench_from_es.Article'),
+        'tags': MultiJoin(name='tags', source='bench_from_es.Article',
+                          target='bench_from_es.Article'),
+        'created': Date(name='created'),
+    }
+
+
+class Comment(Model):
+    __slots__ = ('title', 'body', 'category', 'views')
+
+    _meta = {
+        '_doc_type': 'bench_comment'
+    }
+    _mapping = {
+        'id': Keyword(name='id'),
+        'title': Text(name='title'),
+        'body': Text(name='body'),
+        'category': Keyword(name='category'),
+        'views': Integer(name='views'),
+    }
+
+
+def make_hits(count):
+    return [{'_id': 'article%s' % i,
+             '_source': {'title': 'Title %s' % i,
+                         'body': 'Lorem ipsum ' * 20,
+                         'category': 'category%s' % (i % 10),
+                         'views': i,
+                         'author': 'author%s' % (i % 100),
+                         'tags': ['tag1', 'tag2'],
+                         'created': '2020-01-%02dT10:00:00' % (i % 28 + 1)}}
+            for i in range(count)]
+
+
+def bench(name, hydrate, hits, repeat=5):
+    best = min(timeit.repeat(lambda: [hydrate(hit) for hit in hits],
+                             number=1, repeat=repeat))
+    print("%-20s %10.0f hits/s" % (name, len(hits) / best))
+
+
+if __name__ == '__main__':
+    hits = make_hits(10000)
+    bench('Article __init__', Article._hydrate_init, hits)
+    bench('Article hydrator', Article.get_hydrator(), hits)
+    bench('Comment __init__', Comment._hydrate_init, hits)
+    bench('Comment hydrator', Comment.get_hydrator(), hits)
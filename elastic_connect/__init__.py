@@ -1,6 +1,6 @@
 from .connect import es_conf, get_es, create_mappings, connect
 from .connect import delete_index, delete_indices
-from .connect import Result, DocTypeConnection
+from .connect import Result, DocTypeConnection, AsyncDocTypeConnection
 from .data_types import Keyword, Text, Date
 from .data_types import SingleJoin, MultiJoin, SingleJoinLoose, MultiJoinLoose
 from .namespace import Namespace, _namespaces
@@ -9,7 +9,7 @@ from .base_model import Model
 __all__ = [
     'es_conf', 'get_es', 'create_mappings', 'connect',
     'delete_index', 'delete_indices',
-    'Result', 'DocTypeConnection',
+    'Result', 'DocTypeConnection', 'AsyncDocTypeConnection',
     'Keyword', 'Text', 'Date',
     'SingleJoin', 'MultiJoin', 'SingleJoinLoose', 'MultiJoinLoose',
     'Namespace', '_namespaces',
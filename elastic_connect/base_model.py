@@ -1,7 +1,14 @@
 import elastic_connect
 import elastic_connect.data_types as data_types
 import elastic_connect.data_types.base
+import elastic_connect.bulk
+import elastic_connect.cache
+import elastic_connect.save_plan
+import copy
+import elasticsearch.exceptions
 import logging
+import queue
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +26,7 @@ class Model(object):
     child/parent models.
     """
 
-    __slots__ = ('id', )
+    __slots__ = ('id', '_deferred', '_dirty')
 
     _mapping = {  # type: dict[str:data_types.base.BaseDataType]
         'id': data_types.Keyword(name='id'),
@@ -37,12 +44,14 @@ class Model(object):
 
     _es_namespace = elastic_connect._namespaces['_default']
     _es_connection = None
+    _es_async_connection = None
 
     def __init__(self, **kw):
         r"""
         Creates an instance of the model using \*\*kw parameters for
         setting values of attributes. The values get converted by their
-        respective data_type.from_python method.
+        respective data_type.from_python method. All the attributes of
+        the new instance are dirty, see get_dirty_fields().
         """
 
         for property, type in self._mapping.items():
@@ -51,6 +60,7 @@ class Model(object):
             value = kw.get(property, type.get_default_value())
             self.__update(property,
                           type.on_update(type.from_python(value), self))
+        object.__setattr__(self, '_dirty', set(self._mapping))
 
     @classmethod
     def get_index(cls):
@@ -114,6 +124,21 @@ class Model(object):
                          str(cls._es_connection.__dict__))
         return cls._es_connection
 
+    @classmethod
+    def get_async_es_connection(cls):
+        """
+        Initializes or returns an existing AsyncDocTypeConnection to
+        elasticsearch for this model.
+
+        :return: AsyncDocTypeConnection
+        """
+        if not cls._es_async_connection:
+            cls._es_async_connection = elastic_connect.AsyncDocTypeConnection(
+                model=cls, es_namespace=cls._es_namespace,
+                index=cls.get_index(),
+                doc_type=cls.get_doctype())
+        return cls._es_async_connection
+
     @classmethod
     def from_dict(cls, **kw):
         """
@@ -132,15 +157,90 @@ class Model(object):
         Create and return an unsaved model instance based on
         elasticsearch query result.
 
+        Uses the hydrator of the class, see get_hydrator().
+
         :param hit: a ``hit`` from an elasticsearch query
         :return: instance of the model
         """
 
+        return cls.get_hydrator()(hit)
+
+    @classmethod
+    def get_hydrator(cls):
+        """
+        Returns a function creating model instances from elasticsearch
+        hits, compiled once per class.
+
+        The hydrator bypasses __init__ and writes the attributes
+        directly. Values of types not overriding deserialize(),
+        from_es() and from_python() are copied from ``_source`` as they
+        are, other types get converted. on_update() is called only for
+        types which override it, except for joins, as their on_update()
+        handles only models, never ids loaded from elasticsearch.
+        Classes overriding __init__ are hydrated through __init__.
+
+        :return: function(hit) -> Model
+        """
+
+        if '_es_hydrator' not in cls.__dict__:
+            cls._es_hydrator = cls._compile_hydrator()
+        return cls._es_hydrator
+
+    @classmethod
+    def _compile_hydrator(cls):
+        if cls.__init__ is not Model.__init__:
+            return cls._hydrate_init
+
+        base = data_types.base.BaseDataType
+        plain = []
+        converted = []
+        updated = []
+        for property, type in cls._mapping.items():
+            if property == 'id':
+                continue
+            klass = type.__class__
+            if (klass.from_es is base.from_es and
+                    klass.deserialize is base.deserialize and
+                    klass.from_python is base.from_python):
+                plain.append((property, type.name))
+            else:
+                converted.append((property, type.from_es,
+                                  klass.from_python is not base.from_python
+                                  and type.from_python))
+            if (klass.on_update is not base.on_update and
+                    not isinstance(type, data_types.join.Join)):
+                updated.append((property, type.on_update))
+
+        new = object.__new__
+        set_attr = object.__setattr__
+        get_attr = object.__getattribute__
+
+        def hydrate(hit):
+            source = hit['_source']
+            model = new(cls)
+            set_attr(model, 'id', hit['_id'])
+            for property, name in plain:
+                set_attr(model, property, source.get(name))
+            for property, from_es, from_python in converted:
+                value = from_es(source)
+                if from_python:
+                    value = from_python(value)
+                set_attr(model, property, value)
+            for property, on_update in updated:
+                set_attr(model, property,
+                         on_update(get_attr(model, property), model))
+            return model
+
+        return hydrate
+
+    @classmethod
+    def _hydrate_init(cls, hit):
         kwargs = {}
         for property, type in cls._mapping.items():
-            kwargs.update({property: type.from_es(hit['_source'])})
-            kwargs['id'] = hit['_id']
+            kwargs[property] = type.from_es(hit['_source'])
+        kwargs['id'] = hit['_id']
         model = cls(**kwargs)
+        model._clear_dirty()
         return model
 
     @classmethod
@@ -159,6 +259,20 @@ class Model(object):
         ret = cls._create(model)
         return ret
 
+    @classmethod
+    async def acreate(cls, **kw) -> 'Model':
+        """
+        Awaitable counterpart of create()
+
+        :param kw: keyword arguments describing the model's attributes
+        :return: instance of the model with the ``id`` set
+        """
+
+        model = cls.from_dict(**kw)
+        model.id = model._compute_id()
+        ret = await cls._acreate(model)
+        return ret
+
     @classmethod
     def _create(cls, model):
         """
@@ -172,21 +286,78 @@ class Model(object):
         :return: the model with the ``id`` set
         """
 
-        serialized_flat = model.serialize(exclude=['id'], flat=True)
-        if model.id:
-            response = cls.get_es_connection().create(id=model.id,
-                                                      body=serialized_flat)
         # TODO: probably needs to call cls.refresh() to properly prevent
         # creation of duplicates
-        else:
-            logger.debug("serialize in _create %s",
-                         model.serialize(exclude=['id']))
-            response = cls.get_es_connection().index(body=serialized_flat)
+        if elastic_connect.save_plan.SavePlan.has_unsaved(model):
+            return elastic_connect.save_plan.SavePlan(
+                model, create=True).execute()
+        method, kwargs = model._save_request(create=True)
+        response = getattr(cls.get_es_connection(), method)(**kwargs)
         model.id = response['_id']
         logger.debug("model.id from _create %s", model.id)
         model.post_save()
         return model
 
+    @classmethod
+    async def _acreate(cls, model):
+        """
+        Awaitable counterpart of _create()
+
+        :param model: the model to be created
+        :return: the model with the ``id`` set
+        """
+
+        await model.aload_deferred()
+        method, kwargs = model._save_request(create=True)
+        response = await getattr(cls.get_async_es_connection(),
+                                 method)(**kwargs)
+        model.id = response['_id']
+        logger.debug("model.id from _acreate %s", model.id)
+        await model.apost_save()
+        return model
+
+    def _save_request(self, create=False):
+        """
+        Prepares the request which saves the model. Models with an id
+        are updated, models without an id get the id computed by
+        _compute_id() and are created, or indexed if no id was computed.
+        Updates send only the dirty fields, creates load deferred fields
+        which weren't loaded first.
+
+        :param create: default=False, create the model even if it
+            already has an id
+        :return: tuple of the name of the DocTypeConnection method
+            (``update``, ``create`` or ``index``) and it's arguments,
+            (None, None) if the model has no changes to be saved
+        """
+
+        if self.id and not create:
+            cmp = self._compute_id()
+            if cmp and cmp != self.id:
+                raise IntegrityError("Can't save model with a changed "
+                                     "computed id, create a new model")
+            dirty = self.get_dirty_fields()
+            if not dirty:
+                return None, None
+            # unsaved joins are written by a SavePlan afterwards
+            serialized = self.serialize(exclude=['id'], flat=True)
+            if 'id' not in dirty:
+                # a changed id gets the whole model written
+                serialized = {property: value for property, value
+                              in serialized.items() if property in dirty}
+            if not serialized:
+                return None, None
+            return 'update', {'id': self.id, 'body': {'doc': serialized}}
+
+        deferred = self._get_deferred()
+        if deferred is not None:
+            deferred.load()
+        self.id = self._compute_id()
+        serialized_flat = self.serialize(exclude=['id'], flat=True)
+        if self.id:
+            return 'create', {'id': self.id, 'body': serialized_flat}
+        return 'index', {'body': serialized_flat}
+
     def save(self):
         """
         Save a model that has an id, index a model without an id into
@@ -195,42 +366,213 @@ class Model(object):
         database) are not re-saved automatically. You must save them
         yourself if they changed.
 
+        Only the fields changed since the model was loaded or saved are
+        sent, no request is made at all if nothing changed, see
+        get_dirty_fields().
+
+        If any joined models are not saved yet, they are all saved with
+        this model by two _bulk requests, see
+        elastic_connect.save_plan.SavePlan.
+
         :return: self with dependencies updated
         """
-        es_connection = self.get_es_connection()
 
-        if self.id:
-            cmp = self._compute_id()
-            if cmp and cmp != self.id:
-                raise IntegrityError("Can't save model with a changed "
-                                     "computed id, create a new model")
-            serialized = self.serialize(exclude=['id'])
-            es_connection.update(id=self.id,
-                                 body={'doc': serialized})
-        else:
-            self.id = self._compute_id()
-            serialized_flat = self.serialize(exclude=['id'], flat=True)
-            if self.id:
-                response = es_connection.create(id=self.id,
-                                                body=serialized_flat)
-            else:
-                response = es_connection.index(body=serialized_flat)
-                self.id = response['_id']
+        if elastic_connect.save_plan.SavePlan.has_unsaved(self):
+            return elastic_connect.save_plan.SavePlan(self).execute()
+        method, kwargs = self._save_request()
+        if method is None:
+            return self
+        response = getattr(self.get_es_connection(), method)(**kwargs)
+        if method != 'update':
+            self.id = response['_id']
             logger.debug("model.id from save %s", self.id)
         return self.post_save()
 
+    async def asave(self):
+        """
+        Awaitable counterpart of save()
+
+        :return: self with dependencies updated
+        """
+
+        method, kwargs = self._save_request()
+        if method is None:
+            return await self._asave_joins()
+        response = await getattr(self.get_async_es_connection(),
+                                 method)(**kwargs)
+        if method != 'update':
+            self.id = response['_id']
+            logger.debug("model.id from asave %s", self.id)
+        return await self.apost_save()
+
+    def _bulk_action(self, create=False):
+        """
+        Prepares a BulkAction, which saves the model the same way as
+        save() does. If ``create`` is True, the model is always created
+        the same way as _create() does.
+
+        :param create: default=False, create the model even if it
+            already has an id
+        :return: elastic_connect.bulk.BulkAction, None if the model has
+            no changes to be saved
+        """
+
+        op_type, kwargs = self._save_request(create=create)
+        if op_type is None:
+            return None
+        return elastic_connect.bulk.BulkAction(op_type, self, kwargs['body'])
+
+    @classmethod
+    def _bulk(cls, actions, **kw):
+        result = elastic_connect.bulk.bulk(cls._es_namespace.get_es(),
+                                           actions, **kw)
+        elastic_connect.bulk.post_save(actions)
+        return result
+
+    @classmethod
+    def bulk_create(cls, models, **kw):
+        """
+        Creates multiple models using the _bulk endpoint. Models are
+        created the same way as by _create(), i.e. models without an id
+        are indexed, thus receiving id from elasticsearch, models with
+        an id are created. Unsaved models joined to any of them are then
+        saved together by a single SavePlan.
+
+        Failure of a single model doesn't abort the rest of the batch,
+        check the ``errors`` of the returned result.
+
+        :example:
+
+        .. code-block:: python
+
+            result = User.bulk_create([User(email=e) for e in emails])
+            for model, error in result.errors:
+                print("failed", model, error)
+
+        :param models: list of models to be created
+        :param kw: chunk_size, max_chunk_bytes, thread_count and other
+            parameters of elastic_connect.bulk.bulk()
+        :return: elastic_connect.bulk.BulkResult with the ``id`` of the
+            models set
+        """
+
+        actions = [model._bulk_action(create=True) for model in models]
+        return cls._bulk([action for action in actions if action], **kw)
+
+    @classmethod
+    def save_many(cls, models, **kw):
+        """
+        Saves multiple models using the _bulk endpoint. Models are saved
+        the same way as by save(), i.e. models with an id are updated
+        (only the dirty fields, models without changes are skipped),
+        models without an id are indexed. Unsaved models joined to any
+        of them are then saved together by a single SavePlan.
+
+        Failure of a single model doesn't abort the rest of the batch,
+        check the ``errors`` of the returned result.
+
+        :param models: list of models to be saved
+        :param kw: chunk_size, max_chunk_bytes, thread_count and other
+            parameters of elastic_connect.bulk.bulk()
+        :return: elastic_connect.bulk.BulkResult
+        """
+
+        actions = [model._bulk_action() for model in models]
+        return cls._bulk([action for action in actions if action], **kw)
+
+    @classmethod
+    def bulk_writer(cls, **kw):
+        """
+        Returns a BulkWriter of the namespace this model is registered
+        in, see Namespace.bulk_writer()
+
+        :example:
+
+        .. code-block:: python
+
+            with User.bulk_writer(flush_interval=1.0) as writer:
+                for user in users:
+                    writer.add(user)
+
+        :param kw: parameters of elastic_connect.bulk.BulkWriter
+        :return: elastic_connect.bulk.BulkWriter
+        """
+
+        return cls._es_namespace.bulk_writer(**kw)
+
     def post_save(self):
         logger.debug("post_save %s %s", self.__class__.__name__, self.id)
-        ret = []
+        self._clear_dirty()
+        self._add_to_session()
+        self._invalidate_cache()
+        return self
+
+    async def apost_save(self):
+        logger.debug("apost_save %s %s", self.__class__.__name__, self.id)
+        self._clear_dirty()
+        self._add_to_session()
+        self._invalidate_cache()
+        return await self._asave_joins()
+
+    async def _asave_joins(self):
+        """
+        Saves unsaved joined models one by one, the model is re-saved if
+        any were saved.
+        """
+        unloaded = self._unloaded_fields()
+        saved = False
         for property, type in self._mapping.items():
-            ret.append(type.on_save(model=self))
-        logger.debug("post_save ret %s %s", self.id, ret)
-        ret = [r for r in ret if r is not None]
-        if len(ret):
+            if property in unloaded:
+                continue
+            if await type.aon_save(model=self) is not None:
+                self.mark_dirty(property)
+                saved = True
+        if saved:
             # resave, because some child models were updated
-            self.save()
+            await self.asave()
         return self
 
+    def get_dirty_fields(self):
+        """
+        Returns names of the attributes changed since the model was
+        loaded from or saved to elasticsearch. Attributes are marked
+        dirty when they are assigned, changes made in place (e.g.
+        appending to a list) must be marked by mark_dirty().
+
+        :return: set of attribute names
+        """
+        try:
+            return set(object.__getattribute__(self, '_dirty'))
+        except AttributeError:
+            return set()
+
+    def mark_dirty(self, *names):
+        """
+        Marks the attributes as changed, so that save() sends them.
+
+        :param names: names of the attributes
+        :return: None
+        """
+        try:
+            dirty = object.__getattribute__(self, '_dirty')
+        except AttributeError:
+            dirty = set()
+            object.__setattr__(self, '_dirty', dirty)
+        dirty.update(names)
+
+    def _clear_dirty(self):
+        try:
+            object.__delattr__(self, '_dirty')
+        except AttributeError:
+            pass
+
+    def _set_loaded(self, name, value):
+        """
+        Sets a value loaded from elasticsearch, e.g. a lazy loaded join.
+        The attribute doesn't become dirty.
+        """
+        return self.__update(name, value)
+
     def delete(self):
         """
         Delete a model from elasticsearch.
@@ -239,12 +581,50 @@ class Model(object):
         """
 
         self.get_es_connection().delete(id=self.id)
+        self._post_delete()
+
+    async def adelete(self):
+        """
+        Awaitable counterpart of delete()
+
+        :return: None
+        """
+
+        await self.get_async_es_connection().delete(id=self.id)
+        self._post_delete()
+
+    def _add_to_session(self):
+        session = self._es_namespace.get_session()
+        if session is not None:
+            session.add(self)
+
+    def _post_delete(self):
+        session = self._es_namespace.get_session()
+        if session is not None:
+            session.remove(self)
+        self._invalidate_cache()
+
+    def _invalidate_cache(self):
+        cache = self.get_cache()
+        if cache is not None:
+            cache.invalidate(self.id)
+        self._invalidate_query_cache()
+
+    @classmethod
+    def _invalidate_query_cache(cls):
+        query_cache = cls.get_query_cache()
+        if query_cache is not None:
+            query_cache.clear()
 
     def _lazy_load(self):
         """
         Lazy loads model's joins - child / parent models.
         """
 
+        deferred = self._get_deferred()
+        if deferred is not None:
+            deferred.load()
+
         for property, type in self._mapping.items():
             logger.debug("pre _lazy_load %s %s",
                          property, self.__getattribute__(property))
@@ -252,6 +632,18 @@ class Model(object):
         logger.debug("_lazy_load %s", self)
         return self
 
+    async def _alazy_load(self):
+        """
+        Awaitable counterpart of _lazy_load()
+        """
+
+        await self.aload_deferred()
+
+        for property, type in self._mapping.items():
+            self.__update(property, await type.alazy_load(self))
+        logger.debug("_alazy_load %s", self)
+        return self
+
     @classmethod
     def get(cls, id):
         """
@@ -260,19 +652,329 @@ class Model(object):
         :param id: id of the model to get
         :return: returns an instance of elastic_connect.connect.Result
         """
+        session = cls._es_namespace.get_session()
         if isinstance(id, str):
+            if session is not None and session.get(cls, id) is not None:
+                return session.get(cls, id)
             print("getting single documents %s" % id)
+            if cls.get_cache() is not None:
+                return cls._get_cached(id)
             ret = cls.get_es_connection().get(id=id)
             return ret
         else:
             logger.debug("getting multiple documents %s" % id)
             if not id:
                 return []
+            if session is not None:
+                missing = cls._session_missing(session, id)
+                hits = cls._mget(missing).hits if missing else []
+                return cls._session_result(id, hits)
             print("getting multiple document %s" % id)
-            ret = cls.get_es_connection().mget(body={'ids':id})
+            ret = cls._mget(id)
             return ret
-        
-        
+
+    @classmethod
+    def get_cache(cls):
+        """
+        Returns the cache of Model.get() and Model.aget() configured by
+        ``_meta['_cache']``, i.e. the parameters of
+        elastic_connect.cache.LRUCache. Models without the ``_cache``
+        key in _meta are not cached. Stale entries are refreshed by the
+        synchronous client in a background thread.
+
+        :example:
+
+        .. code-block:: python
+
+            class Config(Model):
+                _meta = {
+                    '_doc_type': 'config',
+                    '_cache': {'ttl': 60, 'max_size': 100,
+                               'negative_ttl': 10, 'stale_ttl': 30},
+                }
+
+            Config.get('main')
+            print(Config.get_cache().stats())
+
+        :return: elastic_connect.cache.LRUCache or None
+        """
+        if '_es_cache' not in cls.__dict__:
+            conf = cls._meta.get('_cache')
+            cls._es_cache = (elastic_connect.cache.LRUCache(**conf)
+                             if conf is not None else None)
+        return cls._es_cache
+
+    @classmethod
+    def get_query_cache(cls):
+        """
+        Returns the cache of search requests (find_by(), all() etc.)
+        configured by ``_meta['_query_cache']``, i.e. the parameters of
+        elastic_connect.cache.LRUCache. The raw search responses are
+        cached, keyed by the canonicalized request. All the entries of a
+        model are invalidated whenever the model is saved, created,
+        deleted or refreshed. Stale entries are not revalidated, thus
+        ``stale_ttl`` has no effect.
+
+        :example:
+
+        .. code-block:: python
+
+            class Article(Model):
+                _meta = {
+                    '_doc_type': 'article',
+                    '_query_cache': {'ttl': 10, 'max_size': 1000,
+                                     'max_bytes': 50 * 1024 * 1024},
+                }
+
+        :return: elastic_connect.cache.LRUCache or None
+        """
+        if '_es_query_cache' not in cls.__dict__:
+            conf = cls._meta.get('_query_cache')
+            cls._es_query_cache = (elastic_connect.cache.LRUCache(**conf)
+                                   if conf is not None else None)
+        return cls._es_query_cache
+
+    @classmethod
+    def _get_cached(cls, id):
+        cache = cls.get_cache()
+        entry = cache.get(id)
+        if entry is None:
+            es_connection = cls.get_es_connection()
+            try:
+                hit = es_connection.raw('get', id=id)
+            except elasticsearch.exceptions.NotFoundError:
+                hit = None
+            cache.set(id, hit)
+        else:
+            hit = entry.value
+            if entry.stale:
+                cls._refresh_cached([id])
+        return cls._cached_model(id, hit)
+
+    @classmethod
+    async def _aget_cached(cls, id):
+        """
+        Awaitable counterpart of _get_cached()
+        """
+        cache = cls.get_cache()
+        entry = cache.get(id)
+        if entry is None:
+            es_connection = cls.get_async_es_connection()
+            try:
+                hit = await es_connection.raw('get', id=id)
+            except elasticsearch.exceptions.NotFoundError:
+                hit = None
+            cache.set(id, hit)
+        else:
+            hit = entry.value
+            if entry.stale:
+                cls._refresh_cached([id])
+        return cls._cached_model(id, hit)
+
+    @classmethod
+    def _cached_model(cls, id, hit):
+        if hit is None:
+            raise elasticsearch.exceptions.NotFoundError(
+                404, 'not_found', {'_index': cls.get_index(), '_id': id,
+                                   'found': False})
+        # the models must not share lists or dicts with the cache
+        return elastic_connect.Result(copy.deepcopy(hit), cls, method='get',
+                                      pass_args={'id': id})[0]
+
+    @classmethod
+    def _mget(cls, ids):
+        """
+        Gets multiple models by a single mget request, serving the ones
+        present in the cache without requesting them. Missing ids are
+        left out of the result.
+
+        :param ids: list of ids of the models
+        :return: elastic_connect.connect.Result
+        """
+        cache = cls.get_cache()
+        if cache is None:
+            return cls.get_es_connection().mget(body={'ids': ids})
+
+        docs, missing, stale = cls._cached_docs(cache, ids)
+        fetched = cls._mget_raw(missing) if missing else []
+        return cls._cached_result(cache, ids, docs, fetched, stale)
+
+    @classmethod
+    async def _amget(cls, ids):
+        """
+        Awaitable counterpart of _mget()
+        """
+        cache = cls.get_cache()
+        connection = cls.get_async_es_connection()
+        if cache is None:
+            return await connection.mget(body={'ids': ids})
+
+        docs, missing, stale = cls._cached_docs(cache, ids)
+        fetched = []
+        if missing:
+            response = await connection.raw('mget', body={'ids': missing})
+            fetched = response['docs']
+        return cls._cached_result(cache, ids, docs, fetched, stale)
+
+    @classmethod
+    def _cached_docs(cls, cache, ids):
+        """
+        :return: tuple of dict of the cached docs by ids (None for ids
+            cached as missing), list of ids not cached and list of ids
+            cached as stale
+        """
+        docs = {}
+        missing = []
+        stale = []
+        for id in ids:
+            entry = cache.get(id)
+            if entry is None:
+                missing.append(id)
+                continue
+            docs[id] = entry.value
+            if entry.stale:
+                stale.append(id)
+        return docs, missing, stale
+
+    @classmethod
+    def _cached_result(cls, cache, ids, docs, fetched, stale):
+        """
+        Caches the ``fetched`` docs and builds the Result of the mget of
+        ``ids``.
+        """
+        for doc in fetched:
+            found = doc if doc.get('found') else None
+            cache.set(doc['_id'], found)
+            docs[doc['_id']] = found
+        if stale:
+            cls._refresh_cached(stale)
+        # the models must not share lists or dicts with the cache
+        docs = copy.deepcopy([docs[id] for id in ids
+                              if docs[id] is not None])
+        return elastic_connect.Result({'docs': docs},
+                                      cls, method='mget',
+                                      pass_args={'body': {'ids': ids}})
+
+    @classmethod
+    def _mget_raw(cls, ids):
+        response = cls.get_es_connection().raw('mget', body={'ids': ids})
+        return response['docs']
+
+    @classmethod
+    def _refresh_cached(cls, ids):
+        """
+        Refreshes stale cache entries in a background thread, while the
+        stale values are being served.
+        """
+        cache = cls.get_cache()
+        refreshed = {}
+        for id in ids:
+            entry = cache.begin_refresh(id)
+            if entry is not None:
+                refreshed[id] = entry
+        ids = list(refreshed)
+        if not ids:
+            return
+
+        def refresh():
+            try:
+                for doc in cls._mget_raw(ids):
+                    # not stored if invalidated by a save in the meantime
+                    cache.set(doc['_id'], doc if doc.get('found') else None,
+                              replace=refreshed[doc['_id']])
+            except Exception as e:
+                logger.warning("refreshing cached %s %s failed: %s",
+                               cls.__name__, ids, e)
+            finally:
+                for id in ids:
+                    cache.end_refresh(id)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    @classmethod
+    def get_by_ids(cls, ids, chunk_size=1000):
+        """
+        Get models by ids from elasticsearch using as few mget requests
+        as possible. Missing ids are silently skipped. Models already
+        present in the Namespace.session() are not requested.
+
+        :param ids: iterable of ids of the models to get
+        :param chunk_size: max number of ids loaded by a single request
+        :return: dict of models by their ids
+        """
+        ids = list(ids)
+        loaded = {}
+        session = cls._es_namespace.get_session()
+        if session is not None:
+            for id in ids:
+                model = session.get(cls, id)
+                if model is not None:
+                    loaded[id] = model
+            ids = [id for id in ids if id not in loaded]
+        for start in range(0, len(ids), chunk_size):
+            result = cls._mget(ids[start:start + chunk_size])
+            for i, hit in enumerate(result.hits):
+                if hit.get('found', True):
+                    loaded[hit['_id']] = result[i]
+        return loaded
+
+    @classmethod
+    async def aget(cls, id):
+        """
+        Awaitable counterpart of get()
+
+        :param id: id of the model to get
+        :return: returns an instance of elastic_connect.connect.Result
+        """
+        session = cls._es_namespace.get_session()
+        if isinstance(id, str):
+            if session is not None and session.get(cls, id) is not None:
+                return session.get(cls, id)
+            if cls.get_cache() is not None:
+                return await cls._aget_cached(id)
+            return await cls.get_async_es_connection().get(id=id)
+        if not id:
+            return []
+        if session is not None:
+            missing = cls._session_missing(session, id)
+            hits = (await cls._amget(missing)).hits if missing else []
+            return cls._session_result(id, hits)
+        return await cls._amget(id)
+
+    @classmethod
+    def _session_missing(cls, session, ids):
+        return [id for id in ids if session.get(cls, id) is None]
+
+    @classmethod
+    def _session_result(cls, ids, hits):
+        """
+        Builds the Result of get() of multiple ids within a
+        Namespace.session(), the same as returned by a mget request.
+        Models present in the session aren't requested, their hits are
+        built from the serialized session instances, which are returned
+        for them.
+
+        :param ids: ids of the models
+        :param hits: docs of the mget of the ids missing in the session
+        :return: elastic_connect.connect.Result
+        """
+        session = cls._es_namespace.get_session()
+        fetched = {hit['_id']: hit for hit in hits}
+        docs = []
+        for id in ids:
+            if id in fetched:
+                docs.append(fetched[id])
+                continue
+            model = session.get(cls, id)
+            if model is None:
+                # missing id left out by a cached mget
+                continue
+            docs.append({'_index': cls.get_index(), '_id': id,
+                         'found': True,
+                         '_source': model.serialize(exclude=['id'],
+                                                    flat=True)})
+        return elastic_connect.Result({'docs': docs}, cls, method='mget',
+                                      pass_args={'body': {'ids': ids}})
 
     @classmethod
     def all(cls, size=100, sort=None):
@@ -287,6 +989,254 @@ class Model(object):
 
         return cls.get_es_connection().search(sort=sort, size=size)
 
+    @classmethod
+    async def aall(cls, size=100, sort=None):
+        """
+        Awaitable counterpart of all()
+
+        :return: returns an instance of elastic_connect.connect.Result
+        """
+        sort = cls.prepare_sort(sort, stringify=True)
+
+        return await cls.get_async_es_connection().search(sort=sort,
+                                                          size=size)
+
+    @classmethod
+    def iter_all(cls, query=None, page_size=100, scroll='1m'):
+        """
+        Iterate over all models in Elasticsearch, one page at a time.
+        The models are read from a consistent point-in-time snapshot of
+        the index (a scroll context sorted by ``_doc``), which is
+        cleared once the generator is exhausted or closed. Memory usage
+        is bounded by a single page regardless of the size of the index.
+
+        :example:
+
+        .. code-block:: python
+
+            for user in User.iter_all(page_size=1000):
+                export(user)
+
+            # only models matching the query, see find_by()
+            for user in User.iter_all(query="email: *@bar.cz"):
+                export(user)
+
+        :param query: optional query as accepted by find_by()
+        :param page_size: number of hits fetched by a single request
+        :param scroll: how long elasticsearch keeps the snapshot between
+            two requests
+        :return: generator of models
+        """
+
+        body, = cls._slice_bodies(1, query, page_size)
+        return cls._iter_scroll(body, scroll)
+
+    @classmethod
+    def iter_columns(cls, fields, query=None, page_size=1000, scroll='1m',
+                     as_numpy=False):
+        """
+        Same as iter_all(), but yields the values of ``fields`` of each
+        page as columns, see elastic_connect.connect.Result.to_columns().
+        Only ``fields`` are fetched from elasticsearch and no models are
+        built.
+
+        :example:
+
+        .. code-block:: python
+
+            for columns in Measurement.iter_columns(['created', 'value'],
+                                                    as_numpy=True):
+                total += columns['value'].sum()
+
+        :param fields: names of the fields
+        :param query: optional query as accepted by find_by()
+        :param page_size: number of hits fetched by a single request
+        :param scroll: how long elasticsearch keeps the snapshot between
+            two requests
+        :param as_numpy: default=False, yield NumPy arrays instead of
+            lists, requires numpy
+        :return: generator of dicts of field name: list or numpy.ndarray
+        """
+
+        body, = cls._slice_bodies(1, query, page_size)
+        includes = [field for field in fields if field != 'id']
+        body['_source'] = {'includes': includes} if includes else False
+        for page in cls._iter_scroll_pages(body, scroll):
+            yield page.to_columns(fields, as_numpy)
+
+    @classmethod
+    def iter_find_by(cls, page_size=100, scroll='1m', query=None, **kw):
+        """
+        Same as find_by(), but iterates over all of the found models,
+        one page at a time, see iter_all().
+
+        :param page_size: number of hits fetched by a single request
+        :param scroll: how long elasticsearch keeps the snapshot between
+            two requests
+        :param query: see find_by()
+        :param kw: attributes of the model by which to search
+        :return: generator of models
+        """
+
+        body = cls._find_by_body(size=page_size, sort=None,
+                                 search_after=None, query=query, **kw)
+        return cls._iter_scroll(body, scroll)
+
+    @classmethod
+    def iter_slices(cls, slices, query=None, page_size=100, scroll='1m'):
+        """
+        Splits the models in Elasticsearch into ``slices`` disjoint
+        partitions using sliced scroll and returns an iterator for each
+        of them, see iter_all(). The iterators may be consumed
+        independently, e.g. each in it's own thread or process.
+
+        :param slices: number of partitions
+        :param query: optional query as accepted by find_by()
+        :param page_size: number of hits fetched by a single request
+        :param scroll: how long elasticsearch keeps the snapshot between
+            two requests
+        :return: list of generators of models
+        """
+
+        return [cls._iter_scroll(body, scroll)
+                for body in cls._slice_bodies(slices, query, page_size)]
+
+    @classmethod
+    def parallel_scan(cls, slices=4, query=None, page_size=100,
+                      scroll='1m', progress=None, max_pages=None):
+        """
+        Iterates over all models in Elasticsearch, reading ``slices``
+        disjoint partitions concurrently, each in it's own thread. The
+        models of all the partitions are yielded by a single iterator in
+        no particular order.
+
+        :example:
+
+        .. code-block:: python
+
+            def report(slice_id, scanned, total):
+                print("slice %s: %s / %s" % (slice_id, scanned, total))
+
+            for user in User.parallel_scan(slices=8, progress=report):
+                export(user)
+
+        :param slices: number of partitions read concurrently
+        :param query: optional query as accepted by find_by()
+        :param page_size: number of hits fetched by a single request
+        :param scroll: how long elasticsearch keeps the snapshot between
+            two requests
+        :param progress: optional callable(slice_id, scanned, total)
+            called from the reading thread after each page of a slice
+        :param max_pages: max number of pages read ahead and waiting to
+            be consumed, default is 2 * slices
+        :return: generator of models
+        """
+
+        if max_pages is None:
+            max_pages = 2 * slices
+        pages = queue.Queue(maxsize=max_pages)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read_slice(slice_id, body):
+            scanned = 0
+            slice_pages = cls._iter_scroll_pages(body, scroll)
+            try:
+                for page in slice_pages:
+                    scanned += len(page)
+                    if progress:
+                        progress(slice_id, scanned,
+                                 page.meta['hits'].get('total'))
+                    if not put(page):
+                        break
+            except Exception as e:
+                put(e)
+            finally:
+                slice_pages.close()
+                put(done)
+
+        threads = [threading.Thread(target=read_slice, args=(i, body),
+                                    daemon=True)
+                   for i, body in enumerate(
+                       cls._slice_bodies(slices, query, page_size))]
+        for thread in threads:
+            thread.start()
+
+        try:
+            finished = 0
+            while finished < len(threads):
+                page = pages.get()
+                if page is done:
+                    finished += 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+                for model in page:
+                    yield model
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    @classmethod
+    def _slice_bodies(cls, slices, query, page_size):
+        if query:
+            body = cls._find_by_body(size=page_size, sort=None,
+                                     search_after=None, query=query)
+        else:
+            body = {"size": page_size, "query": {"match_all": {}}}
+        if slices < 2:
+            return [body]
+        return [dict(body, slice={'id': i, 'max': slices})
+                for i in range(slices)]
+
+    @classmethod
+    def _iter_scroll(cls, body, scroll):
+        """
+        Yields models found by a scroll search with the given body.
+        Order of the models is not defined.
+        """
+
+        for page in cls._iter_scroll_pages(body, scroll):
+            for model in page:
+                yield model
+
+    @classmethod
+    def _iter_scroll_pages(cls, body, scroll):
+        """
+        Yields pages (elastic_connect.connect.Result) found by a scroll
+        search with the given body and clears the scroll afterwards.
+        """
+
+        body = dict(body, sort=['_doc'])
+        es = cls._es_namespace.get_es()
+        scroll_id = None
+        try:
+            result = cls.get_es_connection().search(body=body, scroll=scroll)
+            while len(result):
+                scroll_id = result.meta.get('_scroll_id', scroll_id)
+                yield result
+                pass_args = {'scroll_id': scroll_id, 'scroll': scroll}
+                result = elastic_connect.Result(es.scroll(**pass_args),
+                                                cls, method='scroll',
+                                                pass_args=pass_args)
+            scroll_id = result.meta.get('_scroll_id', scroll_id)
+        finally:
+            if scroll_id:
+                try:
+                    es.clear_scroll(scroll_id=scroll_id)
+                except elasticsearch.exceptions.NotFoundError:
+                    pass
+
     @classmethod
     def get_default_sort(cls):
         """
@@ -342,6 +1292,9 @@ class Model(object):
                 sort=None,
                 search_after=None,
                 query=None,
+                prefetch=None,
+                only=None,
+                defer=None,
                 **kw):
         """
         Search for models in Elasticsearch by attribute values.
@@ -368,6 +1321,9 @@ class Model(object):
             # return models with parent 10 and email _anything_@bar.cz
             model.find_by(query="parent: 10 AND email: *@bar.cz")
 
+            # don't fetch the body until it's accessed
+            model.find_by(parent=10, defer=['body'])
+
         :param size: max number of hits to return. Default = 100.
         :param kw: attributes of the model by which to search
         :param sort: sorting of the result as provided by
@@ -377,9 +1333,75 @@ class Model(object):
             elastic_connect.connect.Result.search_after_values
         :param query: instead of specifying kw search arguments, you may
             enter here a wildcard query
+        :param prefetch: names of joins to be loaded for all the found
+            models at once, see elastic_connect.connect.Result.prefetch()
+        :param only: names of the only fields to be fetched, the other
+            fields are deferred
+        :param defer: names of the fields not to be fetched until they
+            are accessed, for all the found models at once, see
+            elastic_connect.connect.DeferredFields. Saving a model
+            doesn't overwrite it's deferred fields which weren't loaded.
+        :return: returns an instance of elastic_connect.connect.Result
+        """
+
+        body = cls._find_by_body(size=size, sort=sort,
+                                 search_after=search_after, query=query,
+                                 **kw)
+        deferred = cls._defer_source(body, only, defer)
+        logger.debug("find_by body %s", body)
+        ret = cls.get_es_connection().search(body=body).defer(deferred)
+        if prefetch:
+            ret.prefetch(*prefetch)
+        return ret
+
+    @classmethod
+    async def afind_by(cls,
+                       size=100,
+                       sort=None,
+                       search_after=None,
+                       query=None,
+                       only=None,
+                       defer=None,
+                       **kw):
+        """
+        Awaitable counterpart of find_by(). Deferred fields aren't
+        loaded on access, load them by ``await model.aload_deferred()``.
+
         :return: returns an instance of elastic_connect.connect.Result
         """
 
+        body = cls._find_by_body(size=size, sort=sort,
+                                 search_after=search_after, query=query,
+                                 **kw)
+        deferred = cls._defer_source(body, only, defer)
+        logger.debug("afind_by body %s", body)
+        ret = await cls.get_async_es_connection().search(body=body)
+        return ret.defer(deferred, asynchronous=True)
+
+    @classmethod
+    def _defer_source(cls, body, only, defer):
+        """
+        Excludes the deferred fields from ``_source`` of the search body.
+
+        :return: list of the deferred fields
+        """
+
+        if only is not None:
+            deferred = [property for property in cls._mapping
+                        if property not in only]
+        else:
+            deferred = list(defer or [])
+        deferred = [property for property in deferred if property != 'id']
+        if deferred:
+            body['_source'] = {'excludes': deferred}
+        return deferred
+
+    @classmethod
+    def _find_by_body(cls, size, sort, search_after, query, **kw):
+        """
+        Builds the body of the search request of find_by()
+        """
+
         if not query:
             query = kw
 
@@ -404,7 +1426,7 @@ class Model(object):
             else:
                 _query = {
                     "bool": {
-                        "must": [{"term": {k: kw[k]}} for k in query.keys()]
+                        "must": [{"term": {k: query[k]}} for k in query.keys()]
                     }
                 }
 
@@ -416,9 +1438,7 @@ class Model(object):
         if search_after:
             body['search_after'] = search_after
 
-        logger.debug("find_by body %s", body)
-        ret = cls.get_es_connection().search(body=body)
-        return ret
+        return body
 
     def serialize(self,
                   exclude=["password"],
@@ -440,18 +1460,61 @@ class Model(object):
             for console output purposes
         :param flat: default=False, unsaved joined models are returned
             as Models if False, as None if True
-        :return: json representation of the model
+        :return: json representation of the model, without deferred
+            fields which weren't loaded
         """
 
-        ret = {}
-        for property, type in self._mapping.items():
-            if property not in exclude:
-                serialized = type.serialize(self.__getattribute__(property),
-                                            depth=depth,
-                                            to_str=to_str,
-                                            flat=flat)
-                ret.update({property: serialized})
-        return ret
+        unloaded = self._unloaded_fields()
+        if unloaded:
+            exclude = list(exclude) + unloaded
+        return self.get_serializer(exclude, depth, to_str, flat)(self)
+
+    @classmethod
+    def get_serializer(cls,
+                       exclude=["password"],
+                       depth=0,
+                       to_str=False,
+                       flat=False):
+        """
+        Returns a function serializing models of this class, see
+        serialize() for the parameters. The function is generated once
+        per class and combination of parameters and builds the
+        serialized dict in a single expression. Values of types not
+        overriding serialize() are copied as they are.
+
+        :return: function(model) -> dict
+        """
+
+        key = (frozenset(exclude), depth, to_str, flat)
+        if '_es_serializers' not in cls.__dict__:
+            cls._es_serializers = {}
+        serializer = cls._es_serializers.get(key)
+        if serializer is None:
+            serializer = cls._compile_serializer(exclude, depth, to_str,
+                                                 flat)
+            cls._es_serializers[key] = serializer
+        return serializer
+
+    @classmethod
+    def _compile_serializer(cls, exclude, depth, to_str, flat):
+        base_serialize = data_types.base.BaseDataType.serialize
+        namespace = {'get': object.__getattribute__}
+        items = []
+        for i, (property, type) in enumerate(cls._mapping.items()):
+            if property in exclude:
+                continue
+            value = 'get(model, %r)' % property
+            if type.__class__.serialize is not base_serialize:
+                namespace['serialize_%d' % i] = type.serialize
+                value = 'serialize_%d(%s, %r, %r, %r)' % (i, value, depth,
+                                                          to_str, flat)
+            items.append('%r: %s' % (property, value))
+
+        source = 'def serializer(model):\n    return {%s}\n' % \
+            ', '.join(items)
+        exec(compile(source, '<%s serializer>' % cls.__name__, 'exec'),
+             namespace)
+        return namespace['serializer']
 
     def __repr__(self):
         if self.id:
@@ -469,10 +1532,62 @@ class Model(object):
         """
 
         cls._es_namespace.get_es().indices.refresh(index=cls.get_index())
+        cls._invalidate_query_cache()
+
+    @classmethod
+    async def arefresh(cls):
+        """
+        Awaitable counterpart of refresh()
+        """
+
+        await cls._es_namespace.get_async_es().indices.refresh(
+            index=cls.get_index())
+        cls._invalidate_query_cache()
+
+    def __getattr__(self, name):
+        # called only for unset attributes, i.e. deferred fields
+        if name in self._mapping:
+            deferred = self._get_deferred()
+            if deferred is not None:
+                deferred.load()
+                return object.__getattribute__(self, name)
+        raise AttributeError("'%s' object has no attribute '%s'" %
+                             (self.__class__.__name__, name))
+
+    async def aload_deferred(self):
+        """
+        Loads the deferred fields of the model, together with the
+        deferred fields of all the models of the same Result. Required
+        before accessing deferred fields of models found by the async
+        API, e.g. afind_by(defer=...).
+
+        :return: self
+        """
+        deferred = self._get_deferred()
+        if deferred is not None:
+            await deferred.aload()
+        return self
+
+    def _get_deferred(self):
+        try:
+            return object.__getattribute__(self, '_deferred')
+        except AttributeError:
+            return None
+
+    def _unloaded_fields(self):
+        """
+        :return: list of deferred fields not loaded yet
+        """
+        deferred = self._get_deferred()
+        if deferred is None:
+            return []
+        return deferred.unloaded(self)
 
     def __setattr__(self, name, value):
         if name in self._mapping:
-            return self.__update(name, value)
+            self.__update(name, value)
+            self.mark_dirty(name)
+            return self
         return super().__setattr__(name, value)
 
     def __update(self, name, value):
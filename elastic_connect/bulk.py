@@ -0,0 +1,673 @@
+from collections import UserList, deque
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+from elasticsearch.exceptions import TransportError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+"""Default maximal number of actions sent in a single _bulk request."""
+
+DEFAULT_MAX_CHUNK_BYTES = 10 * 1024 * 1024
+"""Default maximal size in bytes of a single _bulk request body."""
+
+DEFAULT_MAX_RETRIES = 3
+"""Default number of retries of actions rejected by elasticsearch."""
+
+DEFAULT_INITIAL_BACKOFF = 0.5
+"""Default number of seconds to wait before the first retry."""
+
+DEFAULT_MAX_BACKOFF = 30.0
+"""Default maximal number of seconds to wait between retries."""
+
+
+class BulkAction(object):
+    """
+    A single action of a _bulk request, bound to the model it operates
+    on. The action is serialized only once, so that the size of the
+    request can be counted before it is sent.
+    """
+
+    def __init__(self, op_type, model, source=None):
+        """
+        :param op_type: one of ``index``, ``create``, ``update`` or
+            ``delete``
+        :param model: the model instance the action operates on
+        :param source: the body of the action, None for ``delete``
+        """
+        self.op_type = op_type
+        self.model = model
+        self.source = source
+        self.data = None
+        self.size = 0
+        self.status = None
+        self.error = None
+
+    def get_header(self):
+        header = {'_index': self.model.get_index(),
+                  '_type': self.model.get_doctype()}
+        if self.model.id:
+            header['_id'] = self.model.id
+        return {self.op_type: header}
+
+    def encode(self, serializer):
+        """
+        Serializes the action to the ndjson lines of a _bulk request.
+
+        :param serializer: serializer of the elasticsearch transport
+        :return: the serialized action
+        """
+        if self.data is None:
+            lines = [serializer.dumps(self.get_header())]
+            if self.source is not None:
+                lines.append(serializer.dumps(self.source))
+            self.data = '\n'.join(lines) + '\n'
+            self.size = len(self.data.encode('utf-8'))
+        return self.data
+
+    def apply(self, item):
+        """
+        Maps one item of the _bulk response back onto the model.
+
+        :param item: the response item belonging to this action
+        :return: None on success, the error reported by elasticsearch
+            otherwise
+        """
+        response = item[self.op_type]
+        self.status = response.get('status', 200)
+        if 'error' in response or response.get('status', 200) >= 300:
+            self.error = response.get('error', response)
+            return self.error
+        self.error = None
+        if self.op_type in ('index', 'create'):
+            self.model.id = response['_id']
+        return None
+
+    def is_rejected(self):
+        """
+        Returns True if elasticsearch rejected the action because of a
+        full write queue, i.e. the action may be safely retried.
+        """
+        return self.status == 429
+
+
+class BulkResult(UserList):
+    """
+    Models processed by one or more _bulk requests, in the order they
+    were passed in. Models which failed to be written are listed in
+    ``errors`` together with the error reported by elasticsearch, the
+    rest of the batch is not affected by them.
+    """
+
+    def __init__(self, models=None):
+        super(BulkResult, self).__init__(models or [])
+        self.errors = []
+        self.took = 0
+        self.requests = 0
+
+    def add_error(self, model, error):
+        logger.warning("bulk %s %s failed: %s",
+                       model.__class__.__name__, model.id, error)
+        self.errors.append((model, error))
+
+    def merge(self, other):
+        self.extend(other)
+        self.errors.extend(other.errors)
+        self.took += other.took
+        self.requests += other.requests
+        return self
+
+
+def chunk_actions(actions, serializer,
+                  chunk_size=DEFAULT_CHUNK_SIZE,
+                  max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES,
+                  sizer=None):
+    """
+    Splits actions into chunks limited both by the number of actions and
+    the size of the serialized request body.
+
+    :param actions: iterable of BulkActions
+    :param serializer: serializer of the elasticsearch transport
+    :param chunk_size: max number of actions in a chunk
+    :param max_chunk_bytes: max size of a chunk in bytes, a single
+        action bigger than the limit is sent in a chunk of it's own
+    :param sizer: AdaptiveSizer, if set it's current chunk_size is used
+        instead of ``chunk_size``
+    :return: generator of lists of BulkActions
+    """
+    chunk = []
+    chunk_bytes = 0
+    for action in actions:
+        action.encode(serializer)
+        if sizer:
+            chunk_size = sizer.chunk_size
+        if chunk and (len(chunk) >= chunk_size or
+                      chunk_bytes + action.size > max_chunk_bytes):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(action)
+        chunk_bytes += action.size
+    if chunk:
+        yield chunk
+
+
+def send_chunk(es, chunk,
+               max_retries=DEFAULT_MAX_RETRIES,
+               initial_backoff=DEFAULT_INITIAL_BACKOFF,
+               max_backoff=DEFAULT_MAX_BACKOFF,
+               sizer=None,
+               **params):
+    """
+    Sends a single chunk of actions as one _bulk request and maps the
+    response items back onto the models. Actions rejected by
+    elasticsearch with status 429 are retried with an exponential
+    backoff, the rest of the chunk is not resent. A request rejected as
+    a whole with status 429 is retried the same way.
+
+    :param es: elasticsearch.Elasticsearch instance
+    :param chunk: list of BulkActions
+    :param max_retries: max number of retries of rejected actions
+    :param initial_backoff: seconds to wait before the first retry, each
+        following retry waits twice as long
+    :param max_backoff: max number of seconds to wait before a retry
+    :param sizer: AdaptiveSizer to be notified of the outcome of each
+        request
+    :param params: additional parameters of the _bulk request, e.g.
+        refresh
+    :return: BulkResult
+    """
+    serializer = es.transport.serializer
+    result = BulkResult()
+    pending = chunk
+    for attempt in range(max_retries + 1):
+        if attempt:
+            backoff = min(max_backoff, initial_backoff * 2 ** (attempt - 1))
+            logger.info("retrying %s rejected bulk actions in %ss",
+                        len(pending), backoff)
+            time.sleep(backoff)
+            if sizer:
+                sizer.retried()
+
+        body = ''.join(action.encode(serializer) for action in pending)
+        try:
+            response = es.bulk(body=body, **params)
+        except TransportError as e:
+            if e.status_code != 429:
+                raise
+            if sizer:
+                sizer.update(sent=len(pending), rejected=len(pending),
+                             took=0)
+            if attempt == max_retries:
+                raise
+            continue
+        took = response.get('took', 0)
+        result.took += took
+        result.requests += 1
+        for action, item in zip(pending, response['items']):
+            action.apply(item)
+
+        rejected = [action for action in pending if action.is_rejected()]
+        if sizer:
+            sizer.update(sent=len(pending), rejected=len(rejected),
+                         took=took)
+        if not rejected:
+            break
+        pending = rejected
+
+    for action in chunk:
+        result.append(action.model)
+        if action.error is not None:
+            result.add_error(action.model, action.error)
+    return result
+
+
+def post_save(actions):
+    """
+    Calls post_save() on models of successfully written actions, so
+    that their joins get handled the same way as by Model.save().
+    Unsaved joined models of all the actions are saved by a single
+    SavePlan. Deleted models are removed from the Namespace.session()
+    and the cache.
+
+    :param actions: list of sent BulkActions
+    :return: None
+    """
+    # save_plan imports this module
+    from .save_plan import SavePlan
+
+    saved = []
+    for action in actions:
+        if action.error is not None:
+            continue
+        if action.op_type == 'delete':
+            action.model._post_delete()
+        else:
+            saved.append(action.model)
+
+    unsaved = [model for model in saved if SavePlan.has_unsaved(model)]
+    if unsaved:
+        for model in unsaved:
+            model._clear_dirty()
+        # post_save() of the planned models is called by the plan
+        SavePlan(*unsaved).execute()
+    planned = {id(model) for model in unsaved}
+    for model in saved:
+        if id(model) not in planned:
+            model.post_save()
+
+
+def _chunk_by_count(actions, chunk_size, sizer=None):
+    chunk = []
+    for action in actions:
+        chunk.append(action)
+        if len(chunk) >= (sizer.chunk_size if sizer else chunk_size):
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parallel_bulk(es, actions,
+                  thread_count=4,
+                  max_in_flight=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE,
+                  max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES,
+                  sizer=None,
+                  **params):
+    """
+    Sends actions to elasticsearch using a pool of threads, each of
+    them serializing and sending it's own chunk of actions. The
+    elasticsearch.Elasticsearch instance is shared by all the threads,
+    so it's connection pool should allow at least ``thread_count``
+    connections per node.
+
+    Results are yielded in the order of the actions, no matter which
+    request finished first.
+
+    :example:
+
+    .. code-block:: python
+
+        es = namespace.get_es()
+        actions = (user._bulk_action() for user in users)
+        for result in parallel_bulk(es, actions, thread_count=8):
+            print(len(result), len(result.errors))
+
+    :param es: elasticsearch.Elasticsearch instance
+    :param actions: iterable of BulkActions
+    :param thread_count: number of threads sending the requests
+    :param max_in_flight: max number of chunks being sent or waiting to
+        be sent at any time, default is 2 * thread_count
+    :param chunk_size: max number of actions in a single request
+    :param max_chunk_bytes: max size of a single request body in bytes
+    :param sizer: AdaptiveSizer, if set it's current chunk_size and
+        concurrency are used instead of ``chunk_size`` and
+        ``max_in_flight``
+    :param params: additional parameters of the _bulk requests, see
+        send_chunk()
+    :return: generator of BulkResults, one for each chunk
+    """
+    if max_in_flight is None:
+        max_in_flight = 2 * thread_count
+    if sizer and sizer.max_concurrency is None:
+        sizer.max_concurrency = thread_count
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=thread_count) as executor:
+        for chunk in _chunk_by_count(actions, chunk_size, sizer):
+            limit = sizer.concurrency if sizer else max_in_flight
+            while len(in_flight) >= limit:
+                yield in_flight.popleft().result()
+            in_flight.append(executor.submit(bulk, es, chunk,
+                                             chunk_size=chunk_size,
+                                             max_chunk_bytes=max_chunk_bytes,
+                                             sizer=sizer,
+                                             **params))
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def bulk(es, actions,
+         chunk_size=DEFAULT_CHUNK_SIZE,
+         max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES,
+         thread_count=None,
+         max_in_flight=None,
+         sizer=None,
+         **params):
+    """
+    Sends actions to elasticsearch in chunks using the _bulk endpoint.
+
+    :param es: elasticsearch.Elasticsearch instance
+    :param actions: iterable of BulkActions
+    :param chunk_size: max number of actions in a single request
+    :param max_chunk_bytes: max size of a single request body in bytes
+    :param thread_count: if set, the requests are sent in parallel by
+        parallel_bulk() using this many threads
+    :param max_in_flight: see parallel_bulk()
+    :param sizer: AdaptiveSizer adapting the chunk_size (and
+        concurrency if sent in parallel) to the load of the cluster
+    :param params: additional parameters of the _bulk requests, see
+        send_chunk()
+    :return: BulkResult
+    """
+    result = BulkResult()
+    if thread_count:
+        for chunk_result in parallel_bulk(es, actions,
+                                          thread_count=thread_count,
+                                          max_in_flight=max_in_flight,
+                                          chunk_size=chunk_size,
+                                          max_chunk_bytes=max_chunk_bytes,
+                                          sizer=sizer,
+                                          **params):
+            result.merge(chunk_result)
+        return result
+
+    for chunk in chunk_actions(actions, es.transport.serializer,
+                               chunk_size, max_chunk_bytes, sizer):
+        logger.debug("sending bulk chunk of %s actions", len(chunk))
+        result.merge(send_chunk(es, chunk, sizer=sizer, **params))
+    return result
+
+
+class BulkWriter(object):
+    """
+    Buffers bulk actions and sends them to elasticsearch once the
+    buffer reaches ``chunk_size`` actions, ``max_chunk_bytes`` bytes or
+    once the oldest buffered action waits longer than
+    ``flush_interval`` seconds. Memory usage is thus bounded by a single
+    chunk regardless of the number of models written.
+
+    Use as a context manager, the remaining actions are flushed on exit.
+    If the with block raises, the flush timer is stopped and the
+    remaining actions are kept unsent, call flush() to send them.
+
+    :example:
+
+    .. code-block:: python
+
+        with namespace.bulk_writer(chunk_size=1000) as writer:
+            for line in source:
+                writer.add(User(email=line))
+        print(writer.batches, writer.docs, writer.bytes, writer.errors)
+    """
+
+    def __init__(self, es,
+                 chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES,
+                 flush_interval=None,
+                 on_error=None,
+                 sizer=None,
+                 **params):
+        """
+        :param es: elasticsearch.Elasticsearch instance
+        :param chunk_size: max number of buffered actions
+        :param max_chunk_bytes: max size of buffered actions in bytes
+        :param flush_interval: max number of seconds an action may wait
+            in the buffer, None to flush on size limits only
+        :param on_error: callable(model, error) called for each failed
+            action
+        :param sizer: AdaptiveSizer, if set it's current chunk_size is
+            used instead of ``chunk_size``
+        :param params: additional parameters of the _bulk requests, see
+            send_chunk()
+        """
+        self.es = es
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.sizer = sizer
+        self.params = params
+
+        self.batches = 0
+        self.docs = 0
+        self.bytes = 0
+        self.errors = 0
+
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._buffer_since = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._timer = None
+
+    def __enter__(self):
+        if self.flush_interval:
+            self._timer = threading.Thread(target=self._flush_periodically,
+                                           daemon=True)
+            self._timer.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # don't hide the exception by a failing flush
+            self._stop_timer()
+
+    def add(self, model):
+        """
+        Saves the model, see Model.save()
+
+        :param model: model to be saved, skipped if it has no changes
+        :return: None
+        """
+        action = model._bulk_action()
+        if action is not None:
+            self._append(action)
+
+    def create(self, model):
+        """
+        Creates the model, see Model._create()
+
+        :param model: model to be created
+        :return: None
+        """
+        self._append(model._bulk_action(create=True))
+
+    def delete(self, model):
+        """
+        Deletes the model, see Model.delete()
+
+        :param model: model to be deleted
+        :return: None
+        """
+        self._append(BulkAction('delete', model))
+
+    def _append(self, action):
+        action.encode(self.es.transport.serializer)
+        with self._lock:
+            overflow = bool(self._buffer) and (
+                self._buffer_bytes + action.size > self.max_chunk_bytes)
+        if overflow:
+            self.flush()
+        with self._lock:
+            if not self._buffer:
+                self._buffer_since = time.monotonic()
+            self._buffer.append(action)
+            self._buffer_bytes += action.size
+            chunk_size = self.sizer.chunk_size if self.sizer else \
+                self.chunk_size
+            full = len(self._buffer) >= chunk_size or self._expired()
+        if full:
+            self.flush()
+
+    def _expired(self):
+        return bool(self.flush_interval and self._buffer and
+                    time.monotonic() - self._buffer_since >=
+                    self.flush_interval)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval / 2.0):
+            with self._lock:
+                expired = self._expired()
+            if not expired:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("bulk writer failed to flush, the actions "
+                                 "are kept for the next flush")
+
+    def flush(self):
+        """
+        Sends all buffered actions in a single _bulk request. The buffer
+        is not locked while the request is being sent, so that actions
+        may still be added. If the request fails, the actions are put
+        back to the buffer and the exception is raised.
+
+        :return: BulkResult of the request, None if there was nothing
+            to send
+        """
+        with self._send_lock:
+            with self._lock:
+                if not self._buffer:
+                    return None
+                chunk = self._buffer
+                chunk_bytes = self._buffer_bytes
+                chunk_since = self._buffer_since
+                self._buffer = []
+                self._buffer_bytes = 0
+                self._buffer_since = None
+
+            logger.debug("flushing bulk writer of %s actions", len(chunk))
+            try:
+                result = send_chunk(self.es, chunk, sizer=self.sizer,
+                                    **self.params)
+            except Exception:
+                with self._lock:
+                    self._buffer[:0] = chunk
+                    self._buffer_bytes += chunk_bytes
+                    self._buffer_since = chunk_since
+                raise
+
+            with self._lock:
+                self.batches += 1
+                self.docs += len(chunk)
+                self.bytes += chunk_bytes
+                self.errors += len(result.errors)
+            if self.on_error:
+                for model, error in result.errors:
+                    self.on_error(model, error)
+            post_save(chunk)
+            return result
+
+    def close(self):
+        """
+        Stops the flush timer and flushes the remaining actions.
+
+        :return: None
+        """
+        self._stop_timer()
+        self.flush()
+
+    def _stop_timer(self):
+        self._closed.set()
+        if self._timer:
+            self._timer.join()
+            self._timer = None
+
+
+class AdaptiveSizer(object):
+    """
+    Adapts the number of actions per _bulk request and the number of
+    requests in flight to the load of the cluster using additive
+    increase / multiplicative decrease. Each request which got some of
+    it's actions rejected (status 429 - es_rejected_execution_exception)
+    or which took longer than ``max_took`` shrinks both values by
+    ``decrease_factor``, each other request grows them by
+    ``chunk_size_step`` and one respectively.
+
+    The current values and the counters may be read at any time for
+    monitoring purposes.
+
+    :example:
+
+    .. code-block:: python
+
+        sizer = AdaptiveSizer(chunk_size=500, max_chunk_size=5000)
+        User.bulk_create(users, thread_count=8, sizer=sizer)
+        print(sizer.chunk_size, sizer.concurrency, sizer.rejections)
+    """
+
+    def __init__(self,
+                 chunk_size=DEFAULT_CHUNK_SIZE,
+                 min_chunk_size=10,
+                 max_chunk_size=10 * DEFAULT_CHUNK_SIZE,
+                 chunk_size_step=None,
+                 concurrency=1,
+                 max_concurrency=None,
+                 decrease_factor=0.5,
+                 max_rejection_rate=0.0,
+                 max_took=None):
+        """
+        :param chunk_size: initial number of actions per request
+        :param min_chunk_size: the chunk_size never shrinks below this
+        :param max_chunk_size: the chunk_size never grows above this
+        :param chunk_size_step: additive increase of chunk_size, default
+            is a tenth of the initial chunk_size
+        :param concurrency: initial number of requests in flight
+        :param max_concurrency: the concurrency never grows above this,
+            default is the thread_count of parallel_bulk()
+        :param decrease_factor: multiplicative decrease of both values
+        :param max_rejection_rate: ratio of rejected actions in a
+            request tolerated without decreasing
+        :param max_took: milliseconds of the ``took`` of a request
+            tolerated without decreasing, None for no limit
+        """
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.chunk_size_step = chunk_size_step or max(1, chunk_size // 10)
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.max_rejection_rate = max_rejection_rate
+        self.max_took = max_took
+
+        self.requests = 0
+        self.actions = 0
+        self.rejections = 0
+        self.rejected_requests = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def retried(self):
+        with self._lock:
+            self.retries += 1
+
+    def update(self, sent, rejected, took):
+        """
+        Adapts chunk_size and concurrency to the outcome of a request.
+
+        :param sent: number of actions sent in the request
+        :param rejected: number of actions rejected by elasticsearch
+        :param took: the ``took`` of the response in milliseconds
+        :return: None
+        """
+        with self._lock:
+            self.requests += 1
+            self.actions += sent
+            self.rejections += rejected
+            if rejected:
+                self.rejected_requests += 1
+
+            overloaded = (sent and rejected / sent > self.max_rejection_rate
+                          or self.max_took is not None and
+                          took > self.max_took)
+            if overloaded:
+                self.chunk_size = max(
+                    self.min_chunk_size,
+                    int(self.chunk_size * self.decrease_factor))
+                self.concurrency = max(
+                    1, int(self.concurrency * self.decrease_factor))
+            else:
+                self.chunk_size = min(self.max_chunk_size,
+                                      self.chunk_size + self.chunk_size_step)
+                max_concurrency = self.max_concurrency or self.concurrency
+                self.concurrency = min(max_concurrency, self.concurrency + 1)
+            logger.debug("bulk sizer chunk_size %s concurrency %s",
+                         self.chunk_size, self.concurrency)
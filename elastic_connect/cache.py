@@ -0,0 +1,166 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class CacheEntry(object):
+    """
+    A single cached value. Entries of missing values (negative caching)
+    have ``value`` None.
+    """
+
+    __slots__ = ('value', 'expires', 'stale_until', 'stale', 'size')
+
+    def __init__(self, value, expires, stale_until, size=0):
+        self.value = value
+        self.expires = expires
+        self.stale_until = stale_until
+        self.stale = False
+        self.size = size
+
+
+class LRUCache(object):
+    """
+    In-process, thread safe LRU cache with a per entry time to live.
+
+    Entries older than ``ttl`` are still returned as stale during
+    ``stale_ttl`` seconds, so that the caller may serve them while
+    refreshing them in the background (stale-while-revalidate).
+
+    Usage is counted in ``hits``, ``stale_hits``, ``misses`` and
+    ``evictions``.
+    """
+
+    def __init__(self, ttl=60.0, max_size=1000, negative_ttl=None,
+                 stale_ttl=0.0, max_bytes=None):
+        """
+        :param ttl: seconds an entry is fresh
+        :param max_size: max number of entries, the least recently used
+            entries are evicted first
+        :param negative_ttl: seconds an entry of a missing value is
+            kept, None to not cache missing values at all
+        :param stale_ttl: seconds after ``ttl`` the entry is served as
+            stale
+        :param max_bytes: max total size of the entries as passed to
+            set(), None for no limit
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        :param key: key of the entry
+        :return: CacheEntry with ``stale`` set accordingly, None on a
+            cache miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.stale_until <= now:
+                if entry is not None:
+                    self._pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry.stale = entry.expires <= now
+            if entry.stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def set(self, key, value, size=0, replace=None):
+        """
+        Stores the value, a None value is stored only if
+        ``negative_ttl`` is set.
+
+        :param key: key of the entry
+        :param value: the value to be cached or None for a missing value
+        :param size: size of the value in bytes, counted against
+            ``max_bytes``
+        :param replace: CacheEntry returned by begin_refresh(), if set
+            the value is stored only if the entry is still cached, i.e.
+            it wasn't invalidated or replaced during the refresh
+        :return: None
+        """
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock:
+            self._refreshing.discard(key)
+            if replace is not None and self._entries.get(key) is not replace:
+                return
+            self._pop(key)
+            if ttl is None:
+                return
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            expires = time.monotonic() + ttl
+            self._entries[key] = CacheEntry(value, expires,
+                                            expires + self.stale_ttl, size)
+            self.bytes += size
+            while (len(self._entries) > self.max_size or
+                   self.max_bytes is not None and
+                   self.bytes > self.max_bytes):
+                evicted, entry = self._entries.popitem(last=False)
+                self.bytes -= entry.size
+                self.evictions += 1
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def invalidate(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def begin_refresh(self, key):
+        """
+        Marks a stale entry as being refreshed.
+
+        :return: the CacheEntry to be passed to set() as ``replace``
+            once refreshed, None if somebody else is refreshing it
+            already or it isn't cached anymore
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if key in self._refreshing or entry is None:
+                return None
+            self._refreshing.add(key)
+            return entry
+
+    def end_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def stats(self):
+        """
+        :return: dict of the usage counters and the current size
+        """
+        with self._lock:
+            return {'size': len(self._entries),
+                    'bytes': self.bytes,
+                    'hits': self.hits,
+                    'stale_hits': self.stale_hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions}
+
+    def __len__(self):
+        return len(self._entries)
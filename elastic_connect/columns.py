@@ -0,0 +1,73 @@
+import datetime
+from .data_types.base import BaseDataType
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def extract_columns(model, hits, fields, as_numpy=False):
+    """
+    Extracts the values of ``fields`` from the ``_source`` of raw
+    elasticsearch hits into one list (or NumPy array) per field, without
+    building any models. Values are deserialized by the field's data
+    type, ``id`` is taken from the hit's ``_id``.
+
+    With ``as_numpy`` the dtype of each array is chosen by the field's
+    data type, see BaseDataType.get_column_dtype(). Integer columns
+    containing missing values become float64 with NaN, missing dates
+    become NaT, timezone aware dates are converted to UTC.
+
+    :param model: class of the model the hits belong to
+    :param hits: list of raw elasticsearch hits
+    :param fields: names of the fields to extract
+    :param as_numpy: default=False, return NumPy arrays instead of lists
+    :return: dict of field name: list or numpy.ndarray
+    :raises: ImportError if ``as_numpy`` and NumPy isn't installed
+    """
+
+    if as_numpy and numpy is None:
+        raise ImportError("as_numpy requires numpy to be installed")
+
+    columns = {}
+    for field in fields:
+        if field == 'id':
+            type = None
+            values = [hit['_id'] for hit in hits]
+        else:
+            type = model._mapping[field]
+            values = [hit['_source'].get(field) for hit in hits]
+            if type.__class__.deserialize is not BaseDataType.deserialize:
+                values = [type.deserialize(value) for value in values]
+        if as_numpy:
+            values = to_array(values, type and type.get_column_dtype())
+        columns[field] = values
+    return columns
+
+
+def to_array(values, dtype):
+    """
+    Converts a list of values to a NumPy array of the given dtype.
+
+    :param values: list of deserialized values, None for missing values
+    :param dtype: NumPy dtype or None for an array of objects
+    :return: numpy.ndarray
+    """
+
+    if dtype is None:
+        array = numpy.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+    if numpy.dtype(dtype).kind == 'M':
+        return numpy.array([_naive_utc(value) for value in values],
+                           dtype=dtype)
+    if numpy.dtype(dtype).kind in 'iu' and None in values:
+        return numpy.array(values, dtype='float64')
+    return numpy.array(values, dtype=dtype)
+
+
+def _naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
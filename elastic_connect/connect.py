@@ -1,5 +1,8 @@
 from collections import UserList
-from .namespace import _namespaces
+import hashlib
+from .columns import extract_columns
+from .hedge import HEDGED_METHODS
+from .namespace import _namespaces, CONNECTION_OPTIONS
 
 
 es_conf = {'_default': {'es_conf': None}}
@@ -10,9 +13,131 @@ def get_es():
     return _namespaces['_default'].get_es()
 
 
+def _is_loaded(model, field):
+    try:
+        object.__getattribute__(model, field)
+    except AttributeError:
+        return False
+    return True
+
+
+class DeferredLoadError(Exception):
+    pass
+
+
+class DeferredFields(object):
+    """
+    Deferred fields of the models of a single Result, i.e. fields
+    excluded from ``_source`` by find_by(only=..., defer=...).
+
+    The deferred attributes of the models are left unset. Accessing any
+    of them loads the deferred fields of all the hits of the Result at
+    once, by mget requests of ``chunk_size`` ids. Models built
+    afterwards get the already loaded values.
+
+    Deferred fields of Results of the async API are not loaded on
+    access, as that would block the event loop. They have to be loaded
+    by ``await model.aload_deferred()`` first, otherwise
+    DeferredLoadError is raised.
+    """
+
+    def __init__(self, model, fields, ids, chunk_size=1000,
+                 asynchronous=False):
+        self.model = model
+        self.fields = fields
+        self.ids = ids
+        self.chunk_size = chunk_size
+        self.asynchronous = asynchronous
+        self.sources = None
+        self.models = []
+
+    def add(self, model):
+        """
+        Makes the fields of a freshly built model deferred, or sets them
+        if they are loaded already.
+        """
+        for field in self.fields:
+            if _is_loaded(model, field):
+                object.__delattr__(model, field)
+        if self.sources is not None:
+            return self._fill(model)
+        object.__setattr__(model, '_deferred', self)
+        self.models.append(model)
+
+    def unloaded(self, model):
+        """
+        :return: list of the fields of the model which are not loaded
+        """
+        return [field for field in self.fields
+                if not _is_loaded(model, field)]
+
+    def load(self):
+        """
+        Loads the deferred fields, fields set explicitly in the meantime
+        are kept.
+        """
+        if self.sources is None:
+            if self.asynchronous:
+                raise DeferredLoadError(
+                    "deferred fields %s of %s found by the async API must "
+                    "be loaded by await model.aload_deferred()" %
+                    (self.fields, self.model.__name__))
+            sources = {}
+            connection = self.model.get_es_connection()
+            for i in range(0, len(self.ids), self.chunk_size):
+                docs = connection.mget(
+                    body={'ids': self.ids[i:i + self.chunk_size]},
+                    _source=self.fields)
+                self._add_sources(sources, docs)
+            self.sources = sources
+        self._fill_all()
+
+    async def aload(self):
+        """
+        Awaitable counterpart of load()
+        """
+        if self.sources is None:
+            sources = {}
+            connection = self.model.get_async_es_connection()
+            for i in range(0, len(self.ids), self.chunk_size):
+                docs = await connection.mget(
+                    body={'ids': self.ids[i:i + self.chunk_size]},
+                    _source=self.fields)
+                self._add_sources(sources, docs)
+            self.sources = sources
+        self._fill_all()
+
+    @staticmethod
+    def _add_sources(sources, docs):
+        for doc in docs.hits:
+            if doc.get('found'):
+                sources[doc['_id']] = doc['_source']
+
+    def _fill_all(self):
+        models, self.models = self.models, []
+        for model in models:
+            self._fill(model)
+
+    def _fill(self, model):
+        source = self.sources.get(model.id, {})
+        for field in self.unloaded(model):
+            type = self.model._mapping[field]
+            value = type.from_python(type.from_es(source))
+            object.__setattr__(model, field, type.on_update(value, model))
+        try:
+            object.__delattr__(model, '_deferred')
+        except AttributeError:
+            pass
+
+
 class Result(UserList):
     """
     Handles the conversion of Elasticsearch query results to models.
+
+    The raw hits are kept and each model is built only when it is
+    accessed for the first time, so ``len()``, ``ids``,
+    ``search_after_values`` and ``meta`` don't need to build any models
+    at all.
     """
 
     def __init__(self, result, model, method, pass_args):
@@ -20,7 +145,6 @@ class Result(UserList):
         self.method = method
         self.pass_args = pass_args
         self.model = model
-        ret = []
         try:
             if 'hits' in result:
                 self.hits = result['hits']['hits']
@@ -29,14 +153,154 @@ class Result(UserList):
         except KeyError:
             self.hits = [result]
 
-        for hit in self.hits:
-            ret.append(model.from_es(hit))
-        self.results = ret
+        self._models = [None] * len(self.hits)
+        self._data = None
+        self.deferred = None
         if len(self.hits) and 'sort' in self.hits[-1]:
             self.search_after_values = self.hits[-1]['sort']
         else:
             self.search_after_values = None
-        super(Result, self).__init__(self.results)
+
+    def _hydrate(self, i):
+        model = self._models[i]
+        if model is None:
+            hit = self.hits[i]
+            session = self.model._es_namespace.get_session()
+            if session is not None:
+                model = session.get(self.model, hit['_id'])
+            if model is None:
+                model = self.model.from_es(hit)
+                if self.deferred is not None:
+                    self.deferred.add(model)
+                if session is not None:
+                    session.add(model)
+            self._models[i] = model
+        return model
+
+    @property
+    def data(self):
+        """
+        @property
+
+        List of all the models of the result. Builds the models not
+        accessed yet.
+        """
+        if self._data is None:
+            self._data = [self._hydrate(i) for i in range(len(self.hits))]
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def results(self):
+        return self.data
+
+    @property
+    def ids(self):
+        """
+        @property
+
+        Ids of the models of the result, the models are not built.
+        """
+        if self._data is None:
+            return [hit['_id'] for hit in self.hits]
+        return [model.id for model in self._data]
+
+    def __len__(self):
+        if self._data is None:
+            return len(self.hits)
+        return len(self._data)
+
+    def __getitem__(self, i):
+        if self._data is None and not isinstance(i, slice):
+            return self._hydrate(range(len(self.hits))[i])
+        return self.data[i]
+
+    def __iter__(self):
+        if self._data is not None:
+            return iter(self._data)
+        return (self._hydrate(i) for i in range(len(self.hits)))
+
+    def defer(self, fields, asynchronous=False):
+        """
+        Marks ``fields`` as deferred - excluded from the ``_source`` of
+        the hits and loaded on the first access, see DeferredFields.
+
+        :param fields: names of the deferred fields, None or empty for
+            no deferred fields
+        :param asynchronous: default=False, True for results of the
+            async API, which load the fields by Model.aload_deferred()
+        :return: self
+        """
+        self.deferred = None
+        if fields:
+            self.deferred = DeferredFields(self.model, list(fields),
+                                           self.ids,
+                                           asynchronous=asynchronous)
+        return self
+
+    def to_columns(self, fields, as_numpy=False):
+        """
+        Extracts the values of ``fields`` straight from the raw hits into
+        one list (or NumPy array) per field, no models are built. See
+        elastic_connect.columns.extract_columns().
+
+        :example:
+
+        .. code-block:: python
+
+            found = Measurement.find_by(sensor='s1', size=10000)
+            columns = found.to_columns(['created', 'value'],
+                                       as_numpy=True)
+            columns['value'].mean()
+
+        :param fields: names of the fields
+        :param as_numpy: default=False, return NumPy arrays instead of
+            lists, requires numpy
+        :return: dict of field name: list or numpy.ndarray
+        """
+        return extract_columns(self.model, self.hits, fields, as_numpy)
+
+    def prefetch(self, *names, chunk_size=1000):
+        """
+        Loads the joins ``names`` of all the models of the result at
+        once, instead of lazy loading them model by model. Ids
+        referenced by all the joins with the same target model are
+        loaded by a single mget request (per ``chunk_size`` ids).
+
+        :example:
+
+        .. code-block:: python
+
+            found = Child.find_by(value='foo')
+            found.prefetch('parent')
+            # no further requests
+            parents = [child.parent for child in found]
+
+        :param names: names of the joins to be loaded
+        :param chunk_size: max number of ids loaded by a single request
+        :return: self
+        """
+        models = self.data
+        joins = [self.model._mapping[name] for name in names]
+        if self.deferred is not None and \
+                set(names).intersection(self.deferred.fields):
+            self.deferred.load()
+
+        ids = {}
+        for join in joins:
+            ids.setdefault(join.get_target(), set()).update(
+                join.prefetch_ids(models))
+
+        loaded = {}
+        for target, target_ids in ids.items():
+            loaded[target] = target.get_by_ids(target_ids, chunk_size)
+
+        for join in joins:
+            join.prefetch_assign(models, loaded[join.get_target()])
+        return self
 
     def search_after(self):
         """
@@ -60,8 +324,21 @@ class Result(UserList):
         :return: further results
         """
         self.pass_args['body']['search_after'] = self.search_after_values
-        return getattr(self.model.get_es_connection(),
-                       self.method)(**self.pass_args)
+        result = getattr(self.model.get_es_connection(),
+                         self.method)(**self.pass_args)
+        return result.defer(self.deferred and self.deferred.fields)
+
+    async def asearch_after(self):
+        """
+        Awaitable counterpart of search_after(), uses the
+        AsyncDocTypeConnection of the model.
+
+        :return: further results
+        """
+        self.pass_args['body']['search_after'] = self.search_after_values
+        result = await getattr(self.model.get_async_es_connection(),
+                               self.method)(**self.pass_args)
+        return result.defer(self.deferred and self.deferred.fields)
 
 
 class DocTypeConnection(object):
@@ -89,12 +366,25 @@ class DocTypeConnection(object):
             underlying elasticsearch connections
         """
         self.es_namespace = es_namespace
-        self.es = es_namespace.get_es()
         self.index_name = index
         self.doc_type = doc_type
         self.default_args = default_args
         self.model = model
 
+    @property
+    def es(self):
+        """
+        The elasticsearch client of the namespace, see _get_es().
+        """
+        return self._get_es(self.es_namespace)
+
+    def _get_es(self, es_namespace):
+        """
+        Returns the client of the namespace, override to use another
+        one.
+        """
+        return es_namespace.get_es()
+
     def get_default_args(self):
         default = {"index": self.index_name, "doc_type": self.doc_type}
         default.update(self.default_args)
@@ -108,17 +398,133 @@ class DocTypeConnection(object):
         """
 
         def helper(**kwargs):
+            pass_args = self.get_default_args().copy()
+            pass_args.update(kwargs)
+            cache, key = self._query_cache_key(name, pass_args)
+            data = self._query_cache_get(cache, key)
+            if data is None:
+                data = self._perform(name, pass_args)
+                self._query_cache_set(cache, key, data)
+            return self._make_result(name, data, pass_args)
+
+        return helper
+
+    def raw(self, name, **kwargs):
+        """
+        Calls the elasticsearch method ``name`` with the default args
+        and returns the JSON response as is. Reads are hedged if
+        enabled on the namespace.
+
+        :param name: name of the method of elasticsearch.Elasticsearch
+        :param kwargs: arguments overriding the default args
+        :return: the JSON response
+        """
+        pass_args = self.get_default_args().copy()
+        pass_args.update(kwargs)
+        return self._perform(name, pass_args)
+
+    def _perform(self, name, pass_args):
+        es_func = getattr(self.es, name)
+        hedger = self.es_namespace.get_hedger()
+        if (hedger is None or name not in HEDGED_METHODS or
+                'scroll' in pass_args):
+            return es_func(**pass_args)
+        return hedger.call(self.es, es_func, pass_args)
+
+    def _query_cache_key(self, name, pass_args):
+        """
+        Returns the query cache of the model and the key of the search
+        request, which is a hash of the canonicalized request
+        arguments. Returns (None, None) if the request is not to be
+        cached.
+        """
+        if name != 'search' or 'scroll' in pass_args:
+            return None, None
+        cache = self.model.get_query_cache()
+        if cache is None:
+            return None, None
+        serialized = self.es.transport.serializer.dumps(
+            self._canonicalize(pass_args))
+        return cache, hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _canonicalize(cls, value):
+        if isinstance(value, dict):
+            return [[k, cls._canonicalize(value[k])]
+                    for k in sorted(value, key=str)]
+        if isinstance(value, (list, tuple)):
+            return [cls._canonicalize(v) for v in value]
+        return value
+
+    def _query_cache_get(self, cache, key):
+        """
+        Returns a copy of the cached response, so that the models don't
+        share lists or dicts with the cache. Stale entries are not
+        served, as they are not revalidated.
+
+        :return: the response or None if it's not cached
+        """
+        if cache is None:
+            return None
+        entry = cache.get(key)
+        if entry is None or entry.stale:
+            return None
+        return self.es.transport.serializer.loads(entry.value)
+
+    def _query_cache_set(self, cache, key, data):
+        if cache is None:
+            return
+        # the response is cached serialized, i.e. copied
+        serialized = self.es.transport.serializer.dumps(data)
+        cache.set(key, serialized, len(serialized.encode('utf-8')))
+
+    def _make_result(self, name, data, pass_args):
+        if 'hits' in data or 'docs' in data or name == "get":
+            result = Result(data, self.model, method=name,
+                            pass_args=pass_args)
+            if name == "get" and len(result) == 1:
+                return result[0]
+            return result
+        return data
+
+
+class AsyncDocTypeConnection(DocTypeConnection):
+    """
+    Asyncio connection for a specific model to Elasticsearch. Same as
+    DocTypeConnection, but all the redirected methods are coroutines
+    and the async client of the namespace is used.
+    """
+
+    def _get_es(self, es_namespace):
+        # bound to the running event loop
+        return es_namespace.get_async_es()
+
+    async def raw(self, name, **kwargs):
+        """
+        Awaitable counterpart of DocTypeConnection.raw(), reads are not
+        hedged.
+        """
+        pass_args = self.get_default_args().copy()
+        pass_args.update(kwargs)
+        return await getattr(self.es, name)(**pass_args)
+
+    def __getattr__(self, name):
+        """
+        All methods are redirected to the underlying async
+        elasticsearch connection. Search and get methods return Result
+        on success, otherwise the JSON from elasticseach is returned.
+        """
+
+        async def helper(**kwargs):
             es_func = getattr(self.es, name)
             pass_args = self.get_default_args().copy()
             pass_args.update(kwargs)
-            data = es_func(**pass_args)
-            if 'hits' in data or 'docs' in data or name == "get":
-                result = Result(data, self.model, method=name,
-                                pass_args=pass_args)
-                if name == "get" and len(result) == 1:
-                    return result[0]
-                return result
-            return data
+            cache, key = self._query_cache_key(name, pass_args)
+            data = self._query_cache_get(cache, key)
+            if data is None:
+                data = await es_func(**pass_args)
+                self._query_cache_set(cache, key, data)
+            return self._make_result(name, data, pass_args)
 
         return helper
 
@@ -157,7 +563,7 @@ def delete_indices(indices):
     return _namespaces['_default'].delete_indices(indices)
 
 
-def connect(conf, index_prefix=''):
+def connect(conf, index_prefix='', **options):
     """
     Establish a connection to elasticsearch using the _default
     namespace.
@@ -165,9 +571,20 @@ def connect(conf, index_prefix=''):
     :param conf: The parameters of the _default namespace
     :param index_prefix: prefix to be used for all indices using this
         connection. Default = ''
+    :param options: connection options of the _default namespace, see
+        Namespace.__init__, i.e. maxsize, pool_block, keep_alive,
+        timeout, connect_timeout, connection_class, compress and
+        compress_threshold
     :return: instance of the _default Namespace
     """
+    for option, value in options.items():
+        if option not in CONNECTION_OPTIONS:
+            raise TypeError("connect() got an unexpected keyword argument "
+                            "'%s'" % option)
+        setattr(_namespaces['_default'], option, value)
     _namespaces['_default'].es = None
+    _namespaces['_default']._drop_async_es()
+    _namespaces['_default']._hedger = None
     _namespaces['_default'].es_conf = conf
     _namespaces['_default']._index_prefix = index_prefix
     return _namespaces['_default']
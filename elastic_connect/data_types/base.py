@@ -1,8 +1,25 @@
 from abc import ABC
 import datetime
+import functools
 from dateutil import parser
 
 
+def parse_date(value):
+    """
+    Parses a date, using the fast datetime.fromisoformat() for the
+    ISO-8601 format and dateutil for anything else.
+
+    :param value: str
+    :return: datetime.datetime
+    """
+    try:
+        if value[-1:] == 'Z':
+            return datetime.datetime.fromisoformat(value[:-1] + '+00:00')
+        return datetime.datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        return parser.parse(value)
+
+
 class BaseDataType(ABC):
 
     def __init__(self, name):
@@ -26,6 +43,9 @@ class BaseDataType(ABC):
     def lazy_load(self, model):
         return model.__getattribute__(self.name)
 
+    async def alazy_load(self, model):
+        return self.lazy_load(model)
+
     def _has_es_type(self):
         if self.name == 'id':
             return False
@@ -43,12 +63,24 @@ class BaseDataType(ABC):
     def on_save(self, model):
         return None
 
+    async def aon_save(self, model):
+        return self.on_save(model)
+
     def on_update(self, value, model):
         return value
 
     def include_in_flat(self):
         return True
 
+    def get_column_dtype(self):
+        """
+        NumPy dtype of the columns of this type, see
+        elastic_connect.columns.extract_columns()
+
+        :return: str or None for an array of objects
+        """
+        return None
+
     def __repr__(self):
         return object.__repr__(self) + str(self.__dict__)
 
@@ -62,6 +94,25 @@ class Text(BaseDataType):
 
 
 class Date(BaseDataType):
+    """
+    Date and time, stored in ISO-8601 format.
+
+    Values in the ISO-8601 format written by serialize() are parsed by
+    datetime.fromisoformat(), other formats by dateutil.
+    """
+
+    def __init__(self, name, memo_size=0):
+        """
+        :param name: name of the property
+        :param memo_size: default=0, number of most recently parsed
+            values to remember, useful when the same dates repeat across
+            the hits, 0 to parse every value
+        """
+        super().__init__(name=name)
+        self.memo_size = memo_size
+        self._parse = parse_date
+        if memo_size:
+            self._parse = functools.lru_cache(maxsize=memo_size)(parse_date)
 
     def from_python(self, value):
         if not isinstance(value, datetime.datetime) and value is not None:
@@ -69,7 +120,12 @@ class Date(BaseDataType):
         return super().from_python(value)
 
     def deserialize(self, value):
-        return parser.parse(value)
+        if value is None:
+            return None
+        return self._parse(value)
+
+    def get_column_dtype(self):
+        return 'datetime64[us]'
 
     def serialize(self, value, depth, to_str, flat):
         return value.isoformat()
@@ -82,11 +138,15 @@ class Boolean(BaseDataType):
 
 
 class Integer(BaseDataType):
-    pass
+
+    def get_column_dtype(self):
+        return 'int64'
 
 
 class Long(BaseDataType):
-    pass
+
+    def get_column_dtype(self):
+        return 'int64'
 
 
 class ScaledFloat(BaseDataType):
@@ -99,3 +159,6 @@ class ScaledFloat(BaseDataType):
         return {'type': 'scaled_float',
                 'scaling_factor': self.scaling_factor
                 }
+
+    def get_column_dtype(self):
+        return 'float64'
@@ -81,6 +81,40 @@ class Join(BaseDataType):
             return False
         return True
 
+    def get_models(self, model):
+        """
+        Returns the joined model instances (as opposed to their ids),
+        used by elastic_connect.save_plan.SavePlan to find unsaved
+        models.
+
+        :param model: the source model
+        :return: list of models
+        """
+        return []
+
+    def prefetch_ids(self, models):
+        """
+        Returns ids of the target models referenced by the models, which
+        are to be loaded by a single batch of requests, see
+        elastic_connect.connect.Result.prefetch()
+
+        :param models: list of source models
+        :return: set of ids
+        """
+        return set()
+
+    def prefetch_assign(self, models, loaded):
+        """
+        Sets the join of each of the models to the prefetched target
+        models.
+
+        :param models: list of source models
+        :param loaded: dict of prefetched target models by their ids
+        :return: None
+        """
+        for model in models:
+            model._set_loaded(self.name, self.lazy_load(model))
+
 
 class SingleJoin(Join):
     """
@@ -97,6 +131,36 @@ class SingleJoin(Join):
             loaded = self.get_target().get(value)
         return loaded
 
+    async def alazy_load(self, model):
+        try:
+            value = model.__getattribute__(self.name).id
+        except AttributeError:
+            value = model.__getattribute__(self.name)
+        loaded = self.get_default_value()
+        if value:
+            loaded = await self.get_target().aget(value)
+        return loaded
+
+    def get_models(self, model):
+        value = model.__getattribute__(self.name)
+        if self._is_value_model(value):
+            return [value]
+        return []
+
+    def prefetch_ids(self, models):
+        ids = set()
+        for model in models:
+            value = model.__getattribute__(self.name)
+            if value and isinstance(value, str):
+                ids.add(value)
+        return ids
+
+    def prefetch_assign(self, models, loaded):
+        for model in models:
+            value = model.__getattribute__(self.name)
+            if value and isinstance(value, str):
+                model._set_loaded(self.name, loaded.get(value))
+
     def serialize(self,
                   value: (str, 'base_model.Model'),  # noqa: F821
                   depth: int,
@@ -140,15 +204,11 @@ class SingleJoin(Join):
                      value.id)
         model.__setattr__(self.name, value)
 
-    def on_save(self, model):
+    async def aon_save(self, model):
         value = model.__getattribute__(self.name)
-        logger.debug("SingleJoin::on_save %s %s %s",
-                     self.name,
-                     model.id,
-                     value and (hasattr(value, 'id') and value.id))
         if value and hasattr(value, 'id') and value.id is None:
-            logger.debug("SingleJoin::on_save - saving")
-            value.save()
+            logger.debug("SingleJoin::aon_save - saving")
+            await value.asave()
             return value
         return None
 
@@ -174,6 +234,34 @@ class MultiJoin(Join):
             value = model.__getattribute__(self.name)
         return self.get_target().get(value)
 
+    async def alazy_load(self, model):
+        try:
+            value = [v.id for v in model.__getattribute__(self.name)]
+        except AttributeError:
+            value = model.__getattribute__(self.name)
+        return await self.get_target().aget(value)
+
+    def get_models(self, model):
+        return [value for value in model.__getattribute__(self.name)
+                if self._is_value_model(value)]
+
+    def prefetch_ids(self, models):
+        ids = set()
+        for model in models:
+            ids.update(v for v in model.__getattribute__(self.name)
+                       if isinstance(v, str))
+        return ids
+
+    def prefetch_assign(self, models, loaded):
+        for model in models:
+            values = []
+            for value in model.__getattribute__(self.name):
+                if isinstance(value, str):
+                    value = loaded.get(value)
+                if value is not None:
+                    values.append(value)
+            model._set_loaded(self.name, values)
+
     def serialize(self,
                   value: (str, 'base_model.Model'),  # noqa: F821
                   depth: int,
@@ -214,15 +302,15 @@ class MultiJoin(Join):
                         if self._is_value_model(r)]
         if value.id not in referred_ids:
             referred_attribute.append(value)
+            model.mark_dirty(self.name)
 
-    def on_save(self, model: 'base_model.Model'):  # noqa: F821
-        logger.debug("MultiJoin::on_save %s %s", self.name, model.id)
+    async def aon_save(self, model: 'base_model.Model'):  # noqa: F821
         ret = []
         values = model.__getattribute__(self.name)
         initialized_values = [v for v in values
                               if v and hasattr(v, 'id') and v.id is None]
         for value in initialized_values:
-            ret.append(value.save())
+            ret.append(await value.asave())
         if len(ret):
             return ret
         return None
@@ -246,6 +334,87 @@ class LooseJoin(Join):
     def from_es(self, es_hit):
         return self.get_default_value()
 
+    def load_referencing(self, ids, page_size=1000, chunk_size=1000):
+        """
+        Loads all target models which reference any of the source
+        models by ``target_property``. Uses a single terms query (per
+        ``chunk_size`` ids) paged by search_after, instead of a search
+        for each of the source models.
+
+        :param ids: ids of the source models
+        :param page_size: number of hits fetched by a single request
+        :param chunk_size: max number of ids in a single terms query
+        :return: dict of lists of target models by source model ids
+        """
+        grouped = self._referencing_groups(ids)
+        connection = self.get_target().get_es_connection()
+        for body in self._referencing_queries(grouped, page_size,
+                                              chunk_size):
+            while True:
+                result = connection.search(body=body)
+                if not self._group_referencing(grouped, result, body,
+                                               page_size):
+                    break
+        return grouped
+
+    async def aload_referencing(self, ids, page_size=1000, chunk_size=1000):
+        """
+        Async version of load_referencing()
+        """
+        grouped = self._referencing_groups(ids)
+        connection = self.get_target().get_async_es_connection()
+        for body in self._referencing_queries(grouped, page_size,
+                                              chunk_size):
+            while True:
+                result = await connection.search(body=body)
+                if not self._group_referencing(grouped, result, body,
+                                               page_size):
+                    break
+        return grouped
+
+    def _referencing_groups(self, ids):
+        assert self.target_property
+        return {id: [] for id in ids if id}
+
+    def _referencing_queries(self, grouped, page_size, chunk_size):
+        ids = list(grouped)
+        sort = self.get_target().prepare_sort()
+        for start in range(0, len(ids), chunk_size):
+            yield {
+                "size": page_size,
+                "query": {
+                    "terms": {
+                        self.target_property: ids[start:start + chunk_size]
+                    }
+                },
+                "sort": sort
+            }
+
+    def _group_referencing(self, grouped, result, body, page_size):
+        """
+        Adds the models of a result page to the ids they reference.
+
+        :return: True if there may be a next page, in that case the body
+            is updated to request it
+        """
+        for model in result:
+            for id in self._referenced_ids(model):
+                if id in grouped:
+                    grouped[id].append(model)
+        if len(result) < page_size:
+            return False
+        body['search_after'] = result.search_after_values
+        return True
+
+    def _referenced_ids(self, model):
+        value = model.__getattribute__(self.target_property)
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        return [v.id if self._is_value_model(v) else v for v in value]
+
+    def prefetch_ids(self, models):
+        return set()
+
 
 class SingleJoinLoose(SingleJoin, LooseJoin):
 
@@ -253,19 +422,33 @@ class SingleJoinLoose(SingleJoin, LooseJoin):
         super().__init__(name=name, source=source, target=target)
         self.do_lazy_load = do_lazy_load
 
+    def prefetch_ids(self, models):
+        return LooseJoin.prefetch_ids(self, models)
+
+    def prefetch_assign(self, models, loaded):
+        grouped = self.load_referencing([model.id for model in models])
+        for model in models:
+            found = grouped.get(model.id)
+            model._set_loaded(self.name, found[0] if found else None)
+
     def lazy_load(self, value):
         if not self.do_lazy_load:
             logger.debug("SingleJoinLoose::lazy_load %s of %s skipped" % (self.name, value))
             return None
 
-        assert self.target_property
-        target = self.get_target()
-        find_by = {self.target_property: value.id}
-        try:
-            ret = target.find_by(**find_by, size=1)[0]
-        except IndexError as e:
-            ret = None
-        return ret
+        if not value.id:
+            return None
+        found = self.load_referencing([value.id])[value.id]
+        return found[0] if found else None
+
+    async def alazy_load(self, value):
+        if not self.do_lazy_load:
+            return None
+
+        if not value.id:
+            return None
+        found = (await self.aload_referencing([value.id]))[value.id]
+        return found[0] if found else None
 
 class MultiJoinLoose(MultiJoin, LooseJoin):
     """
@@ -275,13 +458,27 @@ class MultiJoinLoose(MultiJoin, LooseJoin):
         super().__init__(name=name, source=source, target=target)
         self.do_lazy_load = do_lazy_load
 
+    def prefetch_ids(self, models):
+        return LooseJoin.prefetch_ids(self, models)
+
+    def prefetch_assign(self, models, loaded):
+        grouped = self.load_referencing([model.id for model in models])
+        for model in models:
+            model._set_loaded(self.name, grouped.get(model.id, []))
+
     def lazy_load(self, value):
         if not self.do_lazy_load:
             logger.debug("MultiJoinLoose::lazy_load %s of %s skipped" % (self.name, value))
             return [];
 
-        assert self.target_property
-        target = self.get_target()
-        find_by = {self.target_property: value.id}
-        ret = target.find_by(**find_by)
-        return ret
+        if not value.id:
+            return []
+        return self.load_referencing([value.id])[value.id]
+
+    async def alazy_load(self, value):
+        if not self.do_lazy_load:
+            return []
+
+        if not value.id:
+            return []
+        return (await self.aload_referencing([value.id]))[value.id]
@@ -0,0 +1,167 @@
+import collections
+import concurrent.futures
+import contextvars
+import logging
+import threading
+import time
+from elasticsearch.exceptions import TransportError
+from .selector import avoided_nodes, used_nodes
+
+logger = logging.getLogger(__name__)
+
+HEDGED_METHODS = ('get', 'mget', 'search')
+"""
+Idempotent reads of DocTypeConnection which may be hedged.
+"""
+
+
+class Hedger(object):
+    """
+    Sends hedged read requests: if the response doesn't arrive within
+    the ``percentile`` of the recent read latencies, the same request is
+    sent to another node and whichever response arrives first is used.
+
+    The loser can't be aborted once it's being sent, it's response is
+    dropped. A hedge which didn't start yet is cancelled. Hedging needs
+    at least two nodes. When all ``max_workers`` threads are busy, the
+    request is sent from the calling thread and isn't hedged, as
+    waiting for a free thread would be counted as a slow response.
+
+    Usage is counted in ``requests``, ``sent`` (hedges sent) and
+    ``won`` (hedges answering first).
+    """
+
+    min_samples = 20
+    """
+    Number of measured requests needed before any request is hedged.
+    """
+
+    def __init__(self, percentile=95.0, min_delay=0.005, window=1000,
+                 max_workers=32):
+        """
+        :param percentile: a request is hedged when it takes longer than
+            this percentile of the recent read latencies
+        :param min_delay: minimal delay in seconds before a request is
+            hedged
+        :param window: number of recent latencies taken into account
+        :param max_workers: max number of threads sending the requests,
+            it should match the number of connections of the pool
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.requests = 0
+        self.sent = 0
+        self.won = 0
+        self._latencies = collections.deque(maxlen=window)
+        self._delay = None
+        self._lock = threading.Lock()
+        self._free_workers = threading.BoundedSemaphore(max_workers)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix='elastic_connect_hedge')
+
+    def delay(self):
+        """
+        :return: seconds to wait before a request is hedged, None if
+            there are not enough latencies measured yet
+        """
+        with self._lock:
+            if self._delay is None and \
+                    len(self._latencies) >= self.min_samples:
+                latencies = sorted(self._latencies)
+                index = int(len(latencies) * self.percentile / 100.0)
+                self._delay = max(self.min_delay,
+                                  latencies[min(index, len(latencies) - 1)])
+            return self._delay
+
+    def _record(self, duration):
+        with self._lock:
+            self._latencies.append(duration)
+            # recompute the percentile every 1/10 of the window
+            every = max(1, self._latencies.maxlen // 10)
+            if len(self._latencies) % every == 0:
+                self._delay = None
+
+    def stats(self):
+        return {'requests': self.requests,
+                'sent': self.sent,
+                'won': self.won,
+                'delay': self.delay()}
+
+    def call(self, es, es_func, kwargs):
+        """
+        Calls ``es_func(**kwargs)``, hedging it if it's slow.
+
+        :param es: the Elasticsearch client of es_func
+        :param es_func: the request method of the client
+        :param kwargs: arguments of the request
+        :return: the response of the first node answering
+        """
+        with self._lock:
+            self.requests += 1
+        delay = self.delay()
+        used = []
+        primary = None
+        if delay is not None and \
+                len(es.transport.connection_pool.connections) >= 2:
+            primary = self._submit(es_func, kwargs, used, ())
+        if primary is None:
+            start = time.monotonic()
+            response = es_func(**kwargs)
+            self._record(time.monotonic() - start)
+            return response
+
+        try:
+            return primary.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        hedge = self._submit(es_func, kwargs, [], tuple(used), hedge=True)
+        if hedge is None:
+            return primary.result()
+        pending = {primary, hedge}
+        while True:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            winner = done.pop()
+            if winner.exception() is not None and \
+                    self._node_failed(winner.exception()) and pending:
+                continue
+            for loser in pending:
+                loser.cancel()
+            if winner is hedge and winner.exception() is None:
+                with self._lock:
+                    self.won += 1
+            return winner.result()
+
+    def _submit(self, es_func, kwargs, used, avoid, hedge=False):
+        """
+        Sends the request from a free worker thread.
+
+        :return: future of the response, None if there is no free worker
+        """
+        if not self._free_workers.acquire(blocking=False):
+            return None
+
+        def attempt():
+            used_nodes.set(used)
+            avoided_nodes.set(avoid)
+            if hedge:
+                with self._lock:
+                    self.sent += 1
+            start = time.monotonic()
+            response = es_func(**kwargs)
+            self._record(time.monotonic() - start)
+            return response
+
+        future = self._executor.submit(contextvars.copy_context().run,
+                                       attempt)
+        # released also when a hedge is cancelled before it started
+        future.add_done_callback(lambda f: self._free_workers.release())
+        return future
+
+    @staticmethod
+    def _node_failed(exception):
+        # connection errors and timeouts have a str status_code
+        return isinstance(exception, TransportError) and (
+            not isinstance(exception.status_code, int) or
+            exception.status_code >= 500)
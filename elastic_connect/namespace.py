@@ -1,8 +1,24 @@
 from elasticsearch import Elasticsearch
 import elasticsearch.exceptions
+import asyncio
+import contextlib
+import contextvars
+import inspect
 import time
-import requests
 import logging
+from .bulk import BulkWriter
+from . import readiness
+from .pool import PoolStats, PooledHttpConnection, COMPRESS_THRESHOLD
+from .selector import LatencySelector
+from .hedge import Hedger
+
+try:
+    from elasticsearch import AsyncElasticsearch
+except ImportError:
+    try:
+        from elasticsearch_async import AsyncElasticsearch
+    except ImportError:
+        AsyncElasticsearch = None
 
 _global_prefix = ''
 """
@@ -10,6 +26,15 @@ Global index prefix. Used for example to distinguish between index names
 used in production and in tests.
 """
 
+CONNECTION_OPTIONS = ('maxsize', 'pool_block', 'keep_alive', 'timeout',
+                      'connect_timeout', 'connection_class', 'compress',
+                      'compress_threshold', 'selector_class',
+                      'sniff_interval', 'hedge_percentile',
+                      'hedge_min_delay', 'hedge_max_workers')
+"""
+Connection options of Namespace, which may be passed to connect().
+"""
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,6 +46,52 @@ class NamespaceAlreadyExistsError(Exception):
     pass
 
 
+class Session(object):
+    """
+    Identity map of models loaded or saved within a
+    Namespace.session(). Each model is identified by it's class and id,
+    so that repeated loads of the same model return the same instance
+    without a round trip to elasticsearch.
+    """
+
+    def __init__(self):
+        self.models = {}
+
+    def get(self, model_class, id):
+        """
+        :param model_class: class of the model
+        :param id: id of the model
+        :return: the model instance or None if it's not in the session
+        """
+        return self.models.get((model_class, id))
+
+    def add(self, model):
+        """
+        Adds a model with an id to the session, replacing any other
+        instance of the same model.
+
+        :param model: the model instance
+        :return: None
+        """
+        if model.id:
+            self.models[(model.__class__, model.id)] = model
+
+    def remove(self, model):
+        """
+        Removes a model from the session.
+
+        :param model: the model instance
+        :return: None
+        """
+        self.models.pop((model.__class__, model.id), None)
+
+    def clear(self):
+        self.models.clear()
+
+    def __len__(self):
+        return len(self.models)
+
+
 class Namespace(object):
     """
     Object describing a namespace of an elasticsearch cluster or a
@@ -41,7 +112,13 @@ class Namespace(object):
     application.
     """
 
-    def __init__(self, name, es_conf, index_prefix=None):
+    def __init__(self, name, es_conf, index_prefix=None, maxsize=None,
+                 pool_block=False, keep_alive=True, timeout=None,
+                 connect_timeout=None, connection_class=None,
+                 compress=False, compress_threshold=COMPRESS_THRESHOLD,
+                 selector_class=None, sniff_interval=None,
+                 hedge_percentile=None, hedge_min_delay=0.005,
+                 hedge_max_workers=None):
         """
         :param name: name of the namespace, must be unique
         :param es_conf: the configuration of the namespace i.e. at least
@@ -50,6 +127,42 @@ class Namespace(object):
         :param index_prefix: prefix of the namespace, it should probably
             be unique on the same cluster for sanity reasons, but no
             check is enforced
+        :param maxsize: max number of connections kept open to each
+            node, None for the elasticsearch client default (10)
+        :param pool_block: if True, requests wait for a free connection
+            when all ``maxsize`` connections to the node are in use,
+            instead of opening (and then closing) an extra one
+        :param keep_alive: enable TCP keep-alive on the connections
+        :param timeout: default request timeout in seconds, None for the
+            elasticsearch client default (10)
+        :param connect_timeout: timeout in seconds of establishing a
+            connection, defaults to ``timeout``
+        :param connection_class: elasticsearch Connection class, default
+            elastic_connect.pool.PooledHttpConnection. The pool_block,
+            keep_alive and connect_timeout options and pool_stats()
+            require a PooledHttpConnection subclass.
+        :param compress: gzip request bodies of at least
+            ``compress_threshold`` bytes, i.e. of _bulk and large
+            _search and _mget requests, and accept gzipped responses.
+            The async client compresses all request bodies.
+        :param compress_threshold: min size of a request body in bytes
+            to be gzipped
+        :param selector_class: elasticsearch ConnectionSelector choosing
+            the node for each request if es_conf lists multiple hosts,
+            default elastic_connect.selector.LatencySelector preferring
+            the fastest healthy nodes
+        :param sniff_interval: if set, the nodes of the cluster are
+            sniffed on start, on a connection failure and every
+            ``sniff_interval`` seconds
+        :param hedge_percentile: if set, get, mget and search requests
+            of models taking longer than this percentile of the recent
+            latencies are hedged, i.e. sent to another node as well, see
+            elastic_connect.hedge.Hedger. Requires multiple hosts.
+        :param hedge_min_delay: min delay in seconds before a request is
+            hedged
+        :param hedge_max_workers: max number of threads sending hedged
+            requests, defaults to ``maxsize`` connections per node. Reads
+            exceeding it are sent unhedged.
         """
 
         self.name = name
@@ -57,7 +170,27 @@ class Namespace(object):
         if index_prefix is None:
             index_prefix = name + '_'
         self._index_prefix = index_prefix
+        self.maxsize = maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.connection_class = connection_class
+        self.compress = compress
+        self.compress_threshold = compress_threshold
+        self.selector_class = selector_class
+        self.sniff_interval = sniff_interval
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_workers = hedge_max_workers
+        self._hedger = None
+        self.time_to_ready = None
+        self._pool_stats = PoolStats()
         self.es = None
+        self.async_es = None
+        self._async_loop = None
+        self._session = contextvars.ContextVar('session_' + name,
+                                               default=None)
 
     def register_model_class(self, model_class):
         """
@@ -78,6 +211,7 @@ class Namespace(object):
         class NewModelClass(model_class):
             _es_namespace = None
             _es_connection = None
+            _es_async_connection = None
             __slots__ = model_class.__slots__
 
         NewModelClass.__name__ = self.name + '_' + model_class.__name__
@@ -86,80 +220,324 @@ class Namespace(object):
 
     def get_es(self):
         if not self.es:
-            self.es = Elasticsearch(self.es_conf)
+            self.es = Elasticsearch(self.es_conf, **self._es_options())
         return self.es
 
+    def _es_options(self, pooled=True):
+        options = {}
+        if self.maxsize is not None:
+            options['maxsize'] = self.maxsize
+        if self.timeout is not None:
+            options['timeout'] = self.timeout
+        if self.sniff_interval is not None:
+            options.update(sniff_on_start=True,
+                           sniff_on_connection_fail=True,
+                           sniffer_timeout=self.sniff_interval)
+        if not pooled:
+            if self.compress:
+                options['http_compress'] = True
+            return options
+        connection_class = self.connection_class or PooledHttpConnection
+        options['connection_class'] = connection_class
+        options['selector_class'] = self.selector_class or LatencySelector
+        if issubclass(connection_class, PooledHttpConnection):
+            options.update(pool_stats=self._pool_stats,
+                           pool_block=self.pool_block,
+                           keep_alive=self.keep_alive,
+                           connect_timeout=self.connect_timeout,
+                           compress=self.compress,
+                           compress_threshold=self.compress_threshold)
+        return options
+
+    def pool_stats(self):
+        """
+        Returns usage of the http connection pools of the synchronous
+        client, see elastic_connect.pool.PoolStats.
+
+        :example:
+
+        .. code-block:: python
+
+            >>> namespace.pool_stats()
+            {'nodes': 1, 'in_use': 12, 'idle': 0, 'waits': 310,
+             'requests': 5000, 'new_connections': 322}
+
+        :return: dict of nodes, in_use, idle, waits, requests and
+            new_connections
+        """
+        return self._pool_stats.stats()
+
+    def get_hedger(self):
+        """
+        :return: the Hedger of this namespace, None if hedging is not
+            enabled
+        """
+        if self.hedge_percentile is None:
+            return None
+        if self._hedger is None:
+            max_workers = self.hedge_max_workers
+            if max_workers is None:
+                nodes = self.get_es().transport.connection_pool.connections
+                max_workers = (self.maxsize or 10) * len(nodes)
+            self._hedger = Hedger(percentile=self.hedge_percentile,
+                                  min_delay=self.hedge_min_delay,
+                                  max_workers=max_workers)
+        return self._hedger
+
+    def hedge_stats(self):
+        """
+        :return: dict of requests, sent (hedges sent), won (hedges
+            answering first) and the current delay, None if hedging is
+            not enabled
+        """
+        hedger = self.get_hedger()
+        return hedger.stats() if hedger is not None else None
+
+    def node_stats(self):
+        """
+        Returns latency and error rate of each node of the synchronous
+        client, as measured by the PooledHttpConnection, see
+        elastic_connect.selector.NodeStats.
+
+        :example:
+
+        .. code-block:: python
+
+            >>> namespace.node_stats()
+            {'http://es1:9200': {'latency': 0.004, 'error_rate': 0.0,
+                                 'requests': 812, 'ejected': False},
+             'http://es2:9200': {'latency': 0.031, 'error_rate': 0.2,
+                                 'requests': 97, 'ejected': True}}
+
+        :return: dict of latency (seconds), error_rate, requests and
+            ejected by the node url
+        """
+        pool = self.get_es().transport.connection_pool
+        connections = getattr(pool, 'orig_connections', pool.connections)
+        return {connection.host: connection.node_stats.stats()
+                for connection in connections
+                if hasattr(connection, 'node_stats')}
+
+    def get_async_es(self):
+        """
+        Returns the asyncio elasticsearch client of this namespace.
+        Requires either elasticsearch >= 7.8 or the elasticsearch-async
+        package to be installed.
+
+        The client is bound to the running event loop, a new one is
+        created when called from another loop. Close it using aclose()
+        before the loop is closed.
+
+        :return: AsyncElasticsearch
+        :raises: ImportError if no async elasticsearch client is
+            available
+        """
+        loop = asyncio.get_running_loop()
+        if self.async_es and self._async_loop is not loop:
+            logger.warning("async client of namespace %s was not closed "
+                           "by aclose() before it's event loop ended",
+                           self.name)
+            self.async_es = None
+        if not self.async_es:
+            if AsyncElasticsearch is None:
+                raise ImportError("Async API requires elasticsearch>=7.8 "
+                                  "or elasticsearch-async to be installed")
+            self.async_es = AsyncElasticsearch(
+                self.es_conf, **self._es_options(pooled=False))
+            self._async_loop = loop
+        return self.async_es
+
+    async def aclose(self):
+        """
+        Closes the asyncio elasticsearch client of this namespace and
+        it's connections. A new client is created on the next use.
+
+        :return: None
+        """
+        async_es, self.async_es = self.async_es, None
+        self._async_loop = None
+        if async_es is not None:
+            await self._close_async_es(async_es)
+
+    @staticmethod
+    async def _close_async_es(async_es):
+        closed = async_es.transport.close()
+        if inspect.isawaitable(closed):
+            await closed
+
+    def _drop_async_es(self):
+        """
+        Drops the asyncio client, closing it if it's event loop is
+        running in this thread.
+        """
+        async_es, self.async_es = self.async_es, None
+        loop, self._async_loop = self._async_loop, None
+        if async_es is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None and running is loop:
+            running.create_task(self._close_async_es(async_es))
+        else:
+            logger.warning("async client of namespace %s dropped without "
+                           "being closed by aclose()", self.name)
+
+    @contextlib.contextmanager
+    def session(self):
+        """
+        Opens an identity map for models of this namespace. Within the
+        session Model.get(), mget and lazy loading of joins return the
+        already loaded instances of the same model without a round trip
+        to elasticsearch. Saved models are added to the session, deleted
+        models are removed from it.
+
+        The session is bound to the current thread or asyncio task.
+
+        :example:
+
+        .. code-block:: python
+
+            with namespace.session():
+                one = User.get(user_id)
+                two = User.get(user_id)  # no request
+                assert one is two
+
+        :yield: Session
+        """
+        session = Session()
+        token = self._session.set(session)
+        try:
+            yield session
+        finally:
+            self._session.reset(token)
+
+    def get_session(self):
+        """
+        :return: the Session opened by session() in the current context
+            or None
+        """
+        return self._session.get()
+
+    def bulk_writer(self, **kw):
+        """
+        Returns a BulkWriter streaming bulk actions of models of any
+        class registered in this namespace.
+
+        :param kw: parameters of elastic_connect.bulk.BulkWriter, i.e.
+            chunk_size, max_chunk_bytes, flush_interval, on_error
+        :return: elastic_connect.bulk.BulkWriter
+        """
+        return BulkWriter(self.get_es(), **kw)
+
     def wait_for_yellow(self):
         return self.get_es().cluster.health(wait_for_status="yellow")
 
     def get_es_url(self, https=False):
-        # TODO: handle possible multiple urls
+        """
+        :return: url of the first host of es_conf, see get_es_urls()
+        """
+        return self.get_es_urls(https)[0]
+
+    def get_es_urls(self, https=False):
+        """
+        :param https: whether to use http or https protocol
+        :return: list of the urls of all the hosts of es_conf
+        """
+        return [url for url, auth in self._get_hosts(https)]
+
+    def _get_hosts(self, https=False):
+        """
+        :return: list of (url, http_auth) of all the hosts of es_conf
+        """
         protocol = "http"
         if https:
             protocol += "s"
-        host = self.es_conf[0].get('host', 'localhost')
-        port = self.es_conf[0].get('port', 9200)
-        return "%s://%s:%s" % (protocol, host, port)
+        hosts = self.es_conf or [{}]
+        if not isinstance(hosts, (list, tuple)):
+            hosts = [hosts]
+        urls = []
+        for host in hosts:
+            if isinstance(host, str):
+                urls.append((host if '://' in host else
+                             "%s://%s" % (protocol, host), None))
+                continue
+            auth = host.get('http_auth')
+            if isinstance(auth, str):
+                auth = tuple(auth.split(':', 1))
+            urls.append(("%s://%s:%s" % (protocol,
+                                         host.get('host', 'localhost'),
+                                         host.get('port', 9200)), auth))
+        return urls
 
     def wait_for_http_connection(self,
-                                 initial_wait=10.0,
+                                 initial_wait=0.0,
                                  step=0.1,
                                  timeout=30.0,
                                  https=False):
         """
-        Waits for http(s) connection to elasticsearch to be ready
+        Waits for http(s) connection to any host of elasticsearch to be
+        ready. All the hosts are probed concurrently, with an
+        exponential backoff starting at ``step``.
 
         :param initial_wait: initially wait in seconds
-        :param step: try each step seconds after initial wait
+        :param step: initial delay between the attempts in seconds
         :param timeout: raise NamespaceConnectionError after timeout
             seconds of trying. This includes the inital wait.
         :param https: whether to use http or https protocol
         :return: True
         :raises: NamespaceConnectionError on connection timeout
         """
-        time.sleep(initial_wait)
-        t = initial_wait
-        url = self.get_es_url(https)
-        while t < timeout:
-            t += step
-            time.sleep(step)
-            try:
-                ret = requests.get(url)
-            except Exception:
-                continue
-            if ret.status_code == 200:
-                return True
-        raise NamespaceConnectionError(
-            "Elasticsearch @ %s connection timeout" % url)
+        self._probe(None, initial_wait, step, timeout, https)
+        return True
 
     def wait_for_ready(self,
                        initial_attempt=True,
                        initial_wait=2.0,
                        step=0.1,
                        timeout=30.0,
-                       https=False):
+                       https=False,
+                       status='yellow'):
         """
-        Waits for elasticsearch to get ready. First waits for the node
-        to responde over http, then waits for the cluster to turn at
-        least yellow.
+        Waits for elasticsearch to get ready, i.e. for the cluster to
+        reach at least ``status``. All the hosts are probed
+        concurrently, with an exponential backoff starting at ``step``.
+        The time it took is stored in ``time_to_ready``.
 
-        :param initial_attempt: If True, attempts a http connection
-            right away, even before starting the initial_wait
+        To wait for multiple namespaces at once, use
+        elastic_connect.namespace.wait_for_ready().
+
+        :param initial_attempt: If True, probes right away, otherwise
+            waits initial_wait first
         :param initial_wait: initially wait in seconds
-        :param step: try each step seconds after initial wait
+        :param step: initial delay between the attempts in seconds
         :param timeout: raise NamespaceConnectionError after timeout
             seconds of trying. This includes the inital wait.
         :param https: whether to use http or https protocol
+        :param status: the required cluster health status, 'yellow' or
+            'green'
         :return: returns cluster health info
+        :raises: NamespaceConnectionError on timeout
         """
         if initial_attempt:
-            try:
-                self.wait_for_http_connection(initial_wait=0, step=0,
-                                              timeout=0, https=https)
-            except Exception:
-                self.wait_for_http_connection(initial_wait, step,
-                                              timeout, https)
-        return self.wait_for_yellow()
+            initial_wait = 0.0
+        return self._probe(status, initial_wait, step, timeout, https)
+
+    def _probe(self, status, initial_wait, step, timeout, https):
+        start = time.monotonic()
+        deadline = start + timeout
+        time.sleep(min(initial_wait, timeout))
+        ready = readiness.probe({self.name: self._get_hosts(https)},
+                                status=status,
+                                timeout=max(0.0, deadline - time.monotonic()),
+                                initial_delay=step)
+        if self.name not in ready:
+            raise NamespaceConnectionError(
+                "Elasticsearch @ %s not ready after %s seconds" %
+                (', '.join(self.get_es_urls(https)), timeout))
+        self.time_to_ready = time.monotonic() - start
+        return ready[self.name][1]
 
     @property
     def index_prefix(self):
@@ -282,3 +660,51 @@ def register_namespace(namespace: Namespace):
             "Namespace " + namespace.name + " already exists!")
 
     _namespaces[namespace.name] = namespace
+
+
+def wait_for_ready(namespaces=None, status='yellow', timeout=30.0,
+                   https=False, step=0.05):
+    """
+    Waits for multiple namespaces to get ready, probing all the hosts of
+    all the namespaces concurrently, with an exponential backoff with
+    jitter. Returns as soon as every namespace reached ``status``.
+
+    :example:
+
+    .. code-block:: python
+
+        >>> wait_for_ready()
+        {'_default': 0.012, 'second': 3.1}
+
+    :param namespaces: the namespaces to wait for, default all the
+        registered namespaces
+    :param status: the required cluster health status, 'yellow' or
+        'green'
+    :param timeout: seconds to wait
+    :param https: whether to use http or https protocol
+    :param step: initial delay between the attempts in seconds
+    :return: dict of seconds it took each namespace to get ready by the
+        namespace name, also stored in Namespace.time_to_ready
+    :raises: NamespaceConnectionError naming the namespaces which didn't
+        get ready in time
+    """
+    if namespaces is None:
+        namespaces = list(_namespaces.values())
+    ready = readiness.probe(
+        {namespace.name: namespace._get_hosts(https)
+         for namespace in namespaces},
+        status=status, timeout=timeout, initial_delay=step)
+    times = {}
+    for namespace in namespaces:
+        if namespace.name in ready:
+            namespace.time_to_ready = ready[namespace.name][0]
+            times[namespace.name] = namespace.time_to_ready
+            logger.info("Namespace %s ready in %.3f s", namespace.name,
+                        namespace.time_to_ready)
+    missing = [namespace.name for namespace in namespaces
+               if namespace.name not in ready]
+    if missing:
+        raise NamespaceConnectionError(
+            "Namespaces %s not ready after %s seconds" %
+            (', '.join(missing), timeout))
+    return times
@@ -0,0 +1,182 @@
+import gzip
+import socket
+import threading
+import time
+import urllib3
+from urllib3.connection import HTTPConnection
+from elasticsearch.connection import Urllib3HttpConnection
+from elasticsearch.exceptions import TransportError
+from .selector import NodeStats, is_read, used_nodes
+
+
+class PoolStats(object):
+    """
+    Usage of the http connection pools of a Namespace. A single
+    PoolStats is shared by the connections to all the nodes of the
+    namespace, so that the counters survive replacing the connections
+    e.g. by sniffing.
+
+    ``waits`` counts requests which found all the ``maxsize``
+    connections to the node in use. With ``pool_block=True`` such
+    request waits for a connection to be returned to the pool,
+    otherwise it opens a new connection, which is closed again once the
+    request is done (connection churn). Either way it's a sign that
+    ``maxsize`` should be raised.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = []
+        self.in_use = 0
+        self.waits = 0
+        self.requests = 0
+        self._retired_connections = 0
+
+    def register(self, connection):
+        with self._lock:
+            self._connections.append(connection)
+
+    def unregister(self, connection):
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+                self._retired_connections += connection.pool.num_connections
+
+    def acquire(self, pool):
+        """
+        Counts a request about to take a connection from ``pool``.
+        """
+        with self._lock:
+            self.requests += 1
+            self.in_use += 1
+            if pool.pool is not None and pool.pool.empty():
+                self.waits += 1
+
+    def release(self):
+        with self._lock:
+            self.in_use -= 1
+
+    @staticmethod
+    def _idle(pool):
+        queue = pool.pool
+        if queue is None:
+            return 0
+        with queue.mutex:
+            return sum(1 for conn in queue.queue if conn is not None)
+
+    def stats(self):
+        """
+        :return: dict of
+
+            - nodes: number of nodes connected to
+            - in_use: connections currently serving a request
+            - idle: open connections waiting in the pools for a request
+            - waits: requests which found the pool of their node
+              exhausted
+            - requests: requests sent
+            - new_connections: connections opened since the start
+        """
+        with self._lock:
+            pools = [connection.pool for connection in self._connections]
+            stats = {'nodes': len(pools),
+                     'in_use': self.in_use,
+                     'waits': self.waits,
+                     'requests': self.requests}
+            new_connections = self._retired_connections
+        stats['idle'] = sum(self._idle(pool) for pool in pools)
+        stats['new_connections'] = new_connections + sum(
+            pool.num_connections for pool in pools)
+        return stats
+
+
+COMPRESS_THRESHOLD = 1024
+"""
+Default minimal size in bytes of a request body to be gzipped. Smaller
+bodies, e.g. of get or index requests, aren't worth the cpu time.
+"""
+
+
+class PooledHttpConnection(Urllib3HttpConnection):
+    """
+    Urllib3HttpConnection with tunable connection pooling, reporting
+    it's usage to a PoolStats, and optional gzip compression of large
+    request bodies (i.e. of _bulk, _search and _mget requests) and of
+    the responses. Latency and errors of the node are measured in
+    ``node_stats`` for the LatencySelector. It is the default
+    ``connection_class`` of a Namespace.
+    """
+
+    def __init__(self, pool_stats=None, pool_block=False, keep_alive=True,
+                 connect_timeout=None, compress=False,
+                 compress_threshold=COMPRESS_THRESHOLD, **kwargs):
+        """
+        :param pool_stats: PoolStats to report the usage to
+        :param pool_block: if True, requests wait for a connection when
+            all the ``maxsize`` connections are in use, instead of
+            opening a new one
+        :param keep_alive: enable TCP keep-alive on the connections, so
+            that idle connections aren't dropped by firewalls and load
+            balancers
+        :param connect_timeout: timeout in seconds of establishing a
+            connection, defaults to ``timeout``
+        :param compress: gzip request bodies of at least
+            ``compress_threshold`` bytes and accept gzipped responses
+        :param compress_threshold: min size of a request body in bytes
+            to be gzipped
+        :param kwargs: parameters of Urllib3HttpConnection, i.e. maxsize,
+            timeout
+        """
+        super(PooledHttpConnection, self).__init__(**kwargs)
+        self.pool.block = pool_block
+        if connect_timeout is not None:
+            self.pool.timeout = urllib3.Timeout(connect=connect_timeout,
+                                                read=self.timeout)
+        if keep_alive:
+            self.pool.conn_kw['socket_options'] = (
+                HTTPConnection.default_socket_options +
+                [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)])
+        self.compress = compress
+        self.compress_threshold = compress_threshold
+        if compress:
+            self.headers['accept-encoding'] = 'gzip'
+        self.pool_stats = pool_stats
+        if pool_stats is not None:
+            pool_stats.register(self)
+        self.node_stats = NodeStats()
+
+    def perform_request(self, method, url, params=None, body=None,
+                        timeout=None, ignore=(), headers=None):
+        if self.compress and body is not None:
+            if not isinstance(body, bytes):
+                body = body.encode('utf-8', 'surrogatepass')
+            # the threshold is in bytes, not characters
+            if len(body) >= self.compress_threshold:
+                body = gzip.compress(body, compresslevel=1)
+                headers = dict(headers or (),
+                               **{'content-encoding': 'gzip'})
+        used = used_nodes.get()
+        if used is not None:
+            used.append(self)
+        if self.pool_stats is not None:
+            self.pool_stats.acquire(self.pool)
+        start = time.monotonic()
+        error = True
+        try:
+            response = super(PooledHttpConnection, self).perform_request(
+                method, url, params, body, timeout, ignore, headers)
+            error = False
+            return response
+        except TransportError as e:
+            # connection errors and timeouts have a str status_code
+            error = not isinstance(e.status_code, int) or e.status_code >= 500
+            raise
+        finally:
+            if self.pool_stats is not None:
+                self.pool_stats.release()
+            self.node_stats.record(time.monotonic() - start, error,
+                                   is_read(method, url))
+
+    def close(self):
+        if self.pool_stats is not None:
+            self.pool_stats.unregister(self)
+        super(PooledHttpConnection, self).close()
@@ -0,0 +1,113 @@
+import concurrent.futures
+import random
+import threading
+import time
+import requests
+
+STATUSES = {'red': 0, 'yellow': 1, 'green': 2}
+"""
+Cluster health statuses ordered from the worst.
+"""
+
+
+def check(session, url, status, timeout):
+    """
+    Checks a single host once.
+
+    :param session: requests.Session to send the request with, i.e.
+        with the auth of the host
+    :param url: url of the host
+    :param status: the required cluster health status or None to only
+        require the host to respond to http
+    :param timeout: timeout of the request in seconds
+    :return: the cluster health dict (empty if status is None) if the
+        host is ready, otherwise None
+    """
+    try:
+        if status is None:
+            response = session.get(url, timeout=timeout)
+            return {} if response.status_code == 200 else None
+        response = session.get(url + '/_cluster/health', timeout=timeout)
+        if response.status_code != 200:
+            return None
+        health = response.json()
+    except (requests.RequestException, ValueError):
+        return None
+    if STATUSES.get(health.get('status'), -1) >= STATUSES[status]:
+        return health
+    return None
+
+
+def probe_host(url, status, deadline, ready, auth=None,
+               initial_delay=0.05, max_delay=2.0, request_timeout=1.0):
+    """
+    Checks a host right away and then with an exponential backoff with
+    jitter, until it's ready, the ``ready`` event is set (i.e. another
+    host of the same cluster is ready) or the ``deadline`` passes.
+
+    :param auth: requests auth of the host, i.e. (user, password)
+    :return: the cluster health dict if the host is ready, otherwise
+        None
+    """
+    delay = initial_delay
+    with requests.Session() as session:
+        session.auth = auth
+        while not ready.is_set():
+            remaining = deadline - time.monotonic()
+            health = check(session, url, status,
+                           max(0.01, min(request_timeout, remaining)))
+            if health is not None:
+                return health
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            # "equal jitter" keeps probes of many clients apart, while
+            # still backing off
+            ready.wait(min(remaining,
+                           delay / 2 + random.uniform(0, delay / 2)))
+            delay = min(delay * 2, max_delay)
+    return None
+
+
+def probe(targets, status='yellow', timeout=30.0, **kw):
+    """
+    Probes all the hosts of all the targets concurrently. A target is
+    ready as soon as any of it's hosts is, the rest of it's probes are
+    stopped.
+
+    :param targets: dict of lists of (url, auth) of the hosts by the
+        name of the target, e.g. of a Namespace
+    :param status: the required cluster health status or None to only
+        require the host to respond to http
+    :param timeout: seconds to wait for all the targets
+    :param kw: parameters of probe_host(), i.e. initial_delay,
+        max_delay, request_timeout
+    :return: dict of (seconds to ready, cluster health) by the name of
+        the ready targets
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    events = {name: threading.Event() for name in targets}
+    count = sum(len(hosts) for hosts in targets.values())
+    if not count:
+        return {}
+    executor = concurrent.futures.ThreadPoolExecutor(
+        count, thread_name_prefix='elastic_connect_probe')
+    futures = {executor.submit(probe_host, url, status, deadline,
+                               events[name], auth, **kw): name
+               for name, hosts in targets.items() for url, auth in hosts}
+    ready = {}
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            name = futures[future]
+            health = future.result()
+            if health is not None and name not in ready:
+                ready[name] = (time.monotonic() - start, health)
+                events[name].set()
+            if len(ready) == len(targets):
+                break
+    finally:
+        for event in events.values():
+            event.set()
+        executor.shutdown(wait=False)
+    return ready
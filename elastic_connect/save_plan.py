@@ -0,0 +1,153 @@
+import logging
+import elasticsearch.exceptions
+from .bulk import bulk
+from .data_types.join import Join
+
+logger = logging.getLogger(__name__)
+
+
+class SavePlan(object):
+    """
+    Saves one or more models together with all the unsaved models
+    reachable through their joins (SingleJoin, MultiJoin and their loose
+    variants) using at most two _bulk requests per namespace:
+
+    1. all the unsaved models are created (or indexed). Ids computed by
+       _compute_id() are assigned before anything is serialized, so
+       references to such models are written right away.
+    2. references to models, which received their id from
+       elasticsearch in the first pass, are updated, together with the
+       dirty fields of the already saved root models.
+
+    post_save() of every saved model is called once everything is
+    written.
+
+    :example:
+
+    .. code-block:: python
+
+        parent = Parent(children=[Child(value=i) for i in range(100)])
+        SavePlan(parent).execute()
+        # the same as
+        parent.save()
+    """
+
+    def __init__(self, *roots, create=False):
+        """
+        :param roots: the models to be saved
+        :param create: default=False, create the root models even if
+            they already have an id, see Model._create()
+        """
+        self.roots = roots
+        self.root = roots[0]
+        self.create = create
+        self.models = []
+        self._root_ids = {id(root) for root in roots}
+        seen = set()
+        for root in roots:
+            if id(root) not in seen:
+                self._collect(root, seen)
+
+    def _collect(self, model, seen):
+        """
+        Collects the unsaved models reachable from ``model``, children
+        before their parents.
+        """
+        seen.add(id(model))
+        for joined in self.joined_models(model):
+            if joined.id is None and id(joined) not in seen:
+                self._collect(joined, seen)
+        self.models.append(model)
+
+    @staticmethod
+    def joined_models(model):
+        """
+        :return: list of the models joined to ``model`` by it's loaded
+            joins
+        """
+        unloaded = model._unloaded_fields()
+        joined = []
+        for property, type in model._mapping.items():
+            if property in unloaded or not isinstance(type, Join):
+                continue
+            joined.extend(type.get_models(model))
+        return joined
+
+    @classmethod
+    def has_unsaved(cls, model):
+        """
+        :return: True if any of the models joined to ``model`` is not
+            saved yet
+        """
+        return any(joined.id is None for joined in cls.joined_models(model))
+
+    def _is_new(self, model):
+        if id(model) in self._root_ids:
+            return self.create or model.id is None
+        return True
+
+    def _unsaved_references(self, model):
+        unloaded = model._unloaded_fields()
+        return [property for property, type in model._mapping.items()
+                if property not in unloaded and isinstance(type, Join) and
+                any(joined.id is None for joined in type.get_models(model))]
+
+    def execute(self, **kw):
+        """
+        Writes the models.
+
+        :param kw: parameters of elastic_connect.bulk.bulk()
+        :return: the root model, the first one if there are more
+        :raises: elasticsearch.exceptions.TransportError (or it's
+            subclass by the status, e.g. ConflictError) of the first
+            model which failed to be written
+        """
+
+        new = [model for model in self.models if self._is_new(model)]
+        for model in new:
+            model.id = model._compute_id()
+
+        pending = {}
+        for model in self.models:
+            references = self._unsaved_references(model)
+            if references:
+                pending[id(model)] = references
+
+        self._send([model._bulk_action(create=True) for model in new], kw)
+
+        updates = []
+        for model in self.models:
+            if self._is_new(model):
+                model._clear_dirty()
+            references = pending.get(id(model))
+            if references:
+                model.mark_dirty(*references)
+            action = model._bulk_action()
+            if action is not None:
+                updates.append(action)
+        self._send(updates, kw)
+
+        logger.debug("SavePlan saved %s models, %s updated",
+                     len(new), len(updates))
+        for model in self.models:
+            model.post_save()
+        return self.root
+
+    def _send(self, actions, kw):
+        by_namespace = {}
+        for action in actions:
+            namespace = action.model._es_namespace
+            by_namespace.setdefault(namespace, []).append(action)
+        for namespace, namespace_actions in by_namespace.items():
+            bulk(namespace.get_es(), namespace_actions, **kw)
+            for action in namespace_actions:
+                if action.error is not None:
+                    raise self._error(action)
+
+    @staticmethod
+    def _error(action):
+        error = action.error
+        error_type = error.get('type') if isinstance(error, dict) else error
+        exception = elasticsearch.exceptions.HTTP_EXCEPTIONS.get(
+            action.status, elasticsearch.exceptions.TransportError)
+        return exception(action.status, error_type, error)
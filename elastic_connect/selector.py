@@ -0,0 +1,181 @@
+import contextvars
+import random
+import threading
+import time
+from elasticsearch.connection_pool import ConnectionSelector
+
+READ_ENDPOINTS = ('/_search', '/_mget', '/_count', '/_msearch', '/scroll')
+"""
+Ends of the url paths of read requests besides GET and HEAD requests.
+"""
+
+avoided_nodes = contextvars.ContextVar('avoided_nodes', default=())
+"""
+Connections LatencySelector avoids in the current context, i.e. the node
+serving the request a hedge is sent for.
+"""
+
+used_nodes = contextvars.ContextVar('used_nodes', default=None)
+"""
+List the connections sending requests in the current context are
+appended to, None to not track them.
+"""
+
+
+def is_read(method, url):
+    """
+    :return: True if the request only reads data
+    """
+    return method in ('GET', 'HEAD') or url.endswith(READ_ENDPOINTS)
+
+
+class NodeStats(object):
+    """
+    Latency and error rate of a single node measured from the real
+    traffic as exponentially weighted moving averages. Only the
+    latencies of reads are taken into account, latencies of writes
+    depend too much on the size of the request.
+    """
+
+    alpha = 0.3
+    """
+    Weight of the latest request in the moving averages.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.ejected_until = 0.0
+
+    def record(self, duration, error, read=True):
+        """
+        :param duration: duration of the request in seconds
+        :param error: True if the request failed on the node, i.e. by a
+            connection error, timeout or 5xx status
+        :param read: True if the request was a read
+        :return: None
+        """
+        with self._lock:
+            self.requests += 1
+            self.error_rate += self.alpha * (float(error) - self.error_rate)
+            if read and not error:
+                if self.latency is None:
+                    self.latency = duration
+                else:
+                    self.latency += self.alpha * (duration - self.latency)
+
+    def eject(self, seconds):
+        """
+        Excludes the node from selection for ``seconds``. The averages
+        are reset, so that the node is measured anew once it's back.
+        """
+        with self._lock:
+            self.ejected_until = time.monotonic() + seconds
+            self.latency = None
+            self.error_rate = 0.0
+
+    def is_ejected(self, now=None):
+        return self.ejected_until > (now or time.monotonic())
+
+    def stats(self):
+        return {'latency': self.latency,
+                'error_rate': self.error_rate,
+                'requests': self.requests,
+                'ejected': self.is_ejected()}
+
+
+class LatencySelector(ConnectionSelector):
+    """
+    Selects the connection to a node by it's latency and error rate
+    measured by PooledHttpConnection (see NodeStats).
+
+    Out of two randomly chosen nodes the one with the lower score wins
+    ("power of two choices"), so that the fastest healthy nodes get
+    most of the traffic without all the clients piling on a single
+    node. Nodes without measurements score best, so new nodes are
+    probed right away.
+
+    Only reads are measured for the latency, as writes depend on the
+    size of the request more than on the node, but all the requests,
+    writes included, are routed by it. The error rate counts both.
+
+    A node is ejected for ``eject_time`` seconds, when it's error rate
+    exceeds ``max_error_rate`` or it's latency exceeds ``slow_factor``
+    times the median latency of the nodes. At least one node is always
+    kept. Connections failing outright are in addition marked dead by
+    the elasticsearch ConnectionPool.
+
+    Nodes in ``avoided_nodes`` are skipped if there are any other.
+
+    It is the default ``selector_class`` of a Namespace. Subclass it to
+    tune the class attributes.
+    """
+
+    eject_time = 30.0
+    max_error_rate = 0.5
+    slow_factor = 3.0
+    min_requests = 5
+    """
+    Requests a node has to serve before it may be ejected.
+    """
+    explore = 0.02
+    """
+    Probability of a random choice, which keeps the measurements of
+    the slower nodes up to date.
+    """
+    error_penalty = 10.0
+
+    def select(self, connections):
+        now = time.monotonic()
+        candidates = [connection for connection in connections
+                      if not self._is_ejected(connection, now)]
+        self._eject_outliers(candidates)
+        candidates = [connection for connection in candidates
+                      if not self._is_ejected(connection, now)]
+        if not candidates:
+            candidates = connections
+        avoided = avoided_nodes.get()
+        if avoided:
+            candidates = [connection for connection in candidates
+                          if connection not in avoided] or candidates
+        if len(candidates) == 1:
+            return candidates[0]
+        if random.random() < self.explore:
+            return random.choice(candidates)
+        first, second = random.sample(candidates, 2)
+        return first if self.score(first) <= self.score(second) else second
+
+    def score(self, connection):
+        """
+        :return: the expected cost of sending a request to the node,
+            lower is better
+        """
+        stats = getattr(connection, 'node_stats', None)
+        if stats is None or stats.latency is None:
+            return 0.0
+        return stats.latency * (1 + self.error_penalty * stats.error_rate)
+
+    @staticmethod
+    def _is_ejected(connection, now):
+        stats = getattr(connection, 'node_stats', None)
+        return stats is not None and stats.is_ejected(now)
+
+    def _eject_outliers(self, candidates):
+        measured = [connection.node_stats for connection in candidates
+                    if getattr(connection, 'node_stats', None) is not None and
+                    connection.node_stats.requests >= self.min_requests]
+        latencies = sorted(stats.latency for stats in measured
+                           if stats.latency is not None)
+        median = latencies[(len(latencies) - 1) // 2] if latencies else None
+        healthy = len(candidates)
+        for stats in measured:
+            if healthy <= 1:
+                return
+            if (stats.error_rate > self.max_error_rate or
+                    median and stats.latency is not None and
+                    len(latencies) > 1 and
+                    stats.latency > self.slow_factor * median):
+                stats.eject(self.eject_time)
+                healthy -= 1
@@ -78,9 +78,8 @@ def fix_es(request):
             'port': request.config.getoption("--es-port"),
             }
     elastic_connect._namespaces['_default'].es_conf = [conf]
-    for namespace in elastic_connect._namespaces.values():
-        namespace.wait_for_ready()
-        logger.info(namespace.name + " ready!")
+    times = elastic_connect.namespace.wait_for_ready()
+    logger.info("namespaces ready in %s", times)
 
     es = elastic_connect.get_es()
     template = {
@@ -102,3 +102,13 @@ def test_with_multi_join_serialize():
     assert len(wmj_ser["join"]) == 2
     assert isinstance(wmj_ser["join"][0], Simple)
     assert isinstance(wmj_ser["join"][1], Simple)
+
+
+def test_serializer_cached():
+    s = Simple(id="1", value="12")
+
+    assert s.serialize(exclude=['id']) == {'value': '12'}
+    assert Simple.get_serializer(exclude=('id', )) is \
+        Simple.get_serializer(exclude=['id'])
+    assert Simple.get_serializer(exclude=['id']) is not \
+        Simple.get_serializer(exclude=['id'], depth=1)
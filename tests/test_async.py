@@ -0,0 +1,177 @@
+import asyncio
+import pytest
+from elastic_connect import Model
+from elastic_connect.connect import DeferredLoadError
+import elastic_connect
+import elastic_connect.namespace
+from elastic_connect.data_types import Keyword, SingleJoin, MultiJoin
+
+pytestmark = pytest.mark.skipif(
+    elastic_connect.namespace.AsyncElasticsearch is None,
+    reason="no async elasticsearch client installed")
+
+
+class AsyncParent(Model):
+    __slots__ = ('value', 'children')
+
+    _meta = {
+        '_doc_type': 'model_async_parent'
+    }
+    _mapping = {
+        'id': Keyword(name='id'),
+        'value': Keyword(name='value'),
+        'children': MultiJoin(name='children',
+                              source='test_async.AsyncParent',
+                              target='test_async.AsyncChild:parent')
+    }
+
+
+class AsyncChild(Model):
+    __slots__ = ('value', 'parent')
+
+    _meta = {
+        '_doc_type': 'model_async_child'
+    }
+    _mapping = {
+        'id': Keyword(name='id'),
+        'value': Keyword(name='value'),
+        'parent': SingleJoin(name='parent',
+                             source='test_async.AsyncChild',
+                             target='test_async.AsyncParent:children')
+    }
+
+
+def run_async(coroutine):
+    """
+    Runs the coroutine in a new event loop, closing the async client
+    before the loop is closed.
+    """
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await elastic_connect._namespaces['_default'].aclose()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(scope="module")
+def fix_async_models(request):
+    es = elastic_connect.get_es()
+    indices = elastic_connect.create_mappings(
+        model_classes=[AsyncParent, AsyncChild])
+
+    yield AsyncParent, AsyncChild
+
+    if request.config.getoption("--index-noclean"):
+        print("** not cleaning")
+        return
+
+    elastic_connect.delete_indices(indices=indices)
+    assert not es.indices.exists(index=AsyncParent.get_index())
+
+
+def test_async_create_get(fix_async_models):
+    parent_cls, child_cls = fix_async_models
+
+    async def run():
+        instance = await child_cls.acreate(value='async1')
+        assert instance.id is not None
+
+        loaded = await child_cls.aget(instance.id)
+        assert loaded.id == instance.id
+        assert loaded.value == 'async1'
+
+        loaded.value = 'async2'
+        await loaded.asave()
+        loaded = await child_cls.aget(instance.id)
+        assert loaded.value == 'async2'
+
+        await loaded.adelete()
+        await child_cls.arefresh()
+        found = await child_cls.afind_by(value='async2')
+        assert len(found) == 0
+
+    run_async(run())
+
+
+def test_async_find_by(fix_async_models):
+    parent_cls, child_cls = fix_async_models
+
+    async def run():
+        for i in range(3):
+            await child_cls.acreate(value='async_find')
+        await child_cls.arefresh()
+
+        found = await child_cls.afind_by(value='async_find', size=2)
+        assert len(found) == 2
+
+        found = await found.asearch_after()
+        assert len(found) == 1
+
+    run_async(run())
+
+
+def test_async_find_by_defer(fix_async_models):
+    parent_cls, child_cls = fix_async_models
+
+    async def run():
+        for i in range(2):
+            await child_cls.acreate(value='async_defer')
+        await child_cls.arefresh()
+
+        found = await child_cls.afind_by(value='async_defer',
+                                         only=['parent'])
+        assert len(found) == 2
+        with pytest.raises(DeferredLoadError):
+            found[0].value
+
+        assert await found[0].aload_deferred() is found[0]
+        assert [model.value for model in found] == ['async_defer',
+                                                    'async_defer']
+
+    run_async(run())
+
+
+def test_async_save_joins(fix_async_models):
+    parent_cls, child_cls = fix_async_models
+
+    async def run():
+        parent = parent_cls(value='async_parent',
+                            children=[child_cls(value='async_child1'),
+                                      child_cls(value='async_child2')])
+        await parent.asave()
+        assert parent.id is not None
+        for child in parent.children:
+            assert child.id is not None
+
+        loaded = await parent_cls.aget(parent.id)
+        await loaded._alazy_load()
+        assert [c.value for c in loaded.children] == ['async_child1',
+                                                      'async_child2']
+
+        child = await child_cls.aget(parent.children[0].id)
+        await child._alazy_load()
+        assert child.parent.id == parent.id
+
+    run_async(run())
+
+
+def test_async_client_closed_per_loop():
+    namespace = elastic_connect.Namespace(
+        name='async_loops', es_conf=[{'host': 'localhost', 'port': 9200}])
+
+    async def use():
+        es = namespace.get_async_es()
+        assert namespace.get_async_es() is es
+        await namespace.aclose()
+        assert namespace.async_es is None
+        return es
+
+    assert asyncio.run(use()) is not asyncio.run(use())
+
+    async def leak():
+        return namespace.get_async_es()
+
+    leaked = asyncio.run(leak())
+    assert asyncio.run(use()) is not leaked
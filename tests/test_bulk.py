@@ -0,0 +1,318 @@
+import pytest
+import time
+from types import SimpleNamespace
+from elasticsearch.exceptions import ConnectionError, TransportError
+from elasticsearch.serializer import JSONSerializer
+from elastic_connect import Model
+import elastic_connect
+from elastic_connect.data_types import Keyword
+from elastic_connect.bulk import AdaptiveSizer, BulkWriter, send_chunk
+
+
+class BulkSave(Model):
+    __slots__ = ('value', )
+
+    _meta = {
+        '_doc_type': 'model_bulk_save'
+    }
+    _mapping = {
+        'id': Keyword(name='id'),
+        'value': Keyword(name='value')
+    }
+
+
+@pytest.fixture(scope="module")
+def fix_model_bulk_save(request):
+    es = elastic_connect.get_es()
+    indices = elastic_connect.create_mappings(model_classes=[BulkSave])
+    assert es.indices.exists(index=BulkSave.get_index())
+
+    yield BulkSave
+
+    if request.config.getoption("--index-noclean"):
+        print("** not cleaning")
+        return
+
+    elastic_connect.delete_indices(indices=indices)
+    assert not es.indices.exists(index=BulkSave.get_index())
+
+
+def test_bulk_create(fix_model_bulk_save):
+    cls = fix_model_bulk_save
+
+    models = [cls(value='bulk%s' % i) for i in range(10)]
+    result = cls.bulk_create(models, chunk_size=3)
+
+    assert result.requests == 4
+    assert result.errors == []
+    assert len(result) == 10
+    for model in models:
+        assert model.id is not None
+
+    cls.refresh()
+    found = cls.get([model.id for model in models])
+    assert [f.value for f in found] == ['bulk%s' % i for i in range(10)]
+
+
+def test_bulk_create_max_chunk_bytes(fix_model_bulk_save):
+    cls = fix_model_bulk_save
+
+    models = [cls(value='x' * 100) for i in range(4)]
+    result = cls.bulk_create(models, max_chunk_bytes=200)
+
+    assert result.requests == 4
+    assert result.errors == []
+
+
+def test_bulk_create_errors_dont_abort(fix_model_bulk_save):
+    cls = fix_model_bulk_save
+
+    cls.create(id='bulk_duplicate', value='original')
+    models = [cls(value='before'),
+              cls(id='bulk_duplicate', value='duplicate'),
+              cls(value='after')]
+    result = cls.bulk_create(models)
+
+    assert len(result.errors) == 1
+    assert result.errors[0][0] is models[1]
+    assert models[0].id is not None
+    assert models[2].id is not None
+
+    loaded = cls.get('bulk_duplicate')
+    assert loaded.value == 'original'
+
+
+def test_save_many(fix_model_bulk_save):
+    cls = fix_model_bulk_save
+
+    existing = cls.create(value='old')
+    existing.value = 'updated'
+    new = cls(value='new')
+    result = cls.save_many([existing, new])
+
+    assert result.errors == []
+    assert new.id is not None
+    assert cls.get(existing.id).value == 'updated'
+    assert cls.get(new.id).value == 'new'
+
+
+def test_bulk_writer(fix_model_bulk_save):
+    cls = fix_model_bulk_save
+
+    models = [cls(value='writer%s' % i) for i in range(10)]
+    with cls.bulk_writer(chunk_size=4) as writer:
+        for model in models:
+            writer.add(model)
+        assert writer.batches == 2
+
+    assert writer.batches == 3
+    assert writer.docs == 10
+    assert writer.bytes > 0
+    assert writer.errors == 0
+    for model in models:
+        assert model.id is not None
+
+    cls.refresh()
+    found = cls.find_by(value='writer0')
+    assert len(found) == 1
+
+    with elastic_connect._namespaces['_default'].bulk_writer() as writer:
+        writer.delete(models[0])
+
+    cls.refresh()
+    found = cls.find_by(value='writer0')
+    assert len(found) == 0
+
+
+def test_bulk_writer_flush_interval(fix_model_bulk_save):
+    cls = fix_model_bulk_save
+
+    with cls.bulk_writer(flush_interval=0.1) as writer:
+        writer.add(cls(value='interval'))
+        time.sleep(0.5)
+        assert writer.batches == 1
+
+
+def test_bulk_create_parallel(fix_model_bulk_save):
+    cls = fix_model_bulk_save
+
+    models = [cls(value='parallel%s' % i) for i in range(50)]
+    result = cls.bulk_create(models, chunk_size=5, thread_count=4,
+                             max_in_flight=6)
+
+    assert result.requests == 10
+    assert result.errors == []
+    assert list(result) == models
+    for model in models:
+        assert model.id is not None
+
+
+def test_adaptive_sizer():
+    sizer = AdaptiveSizer(chunk_size=100, min_chunk_size=10,
+                          max_chunk_size=120, chunk_size_step=10,
+                          concurrency=2, max_concurrency=4, max_took=500)
+
+    sizer.update(sent=100, rejected=0, took=100)
+    assert sizer.chunk_size == 110
+    assert sizer.concurrency == 3
+
+    sizer.update(sent=110, rejected=0, took=100)
+    sizer.update(sent=120, rejected=0, took=100)
+    assert sizer.chunk_size == 120
+    assert sizer.concurrency == 4
+
+    sizer.update(sent=120, rejected=5, took=100)
+    assert sizer.chunk_size == 60
+    assert sizer.concurrency == 2
+    assert sizer.rejections == 5
+    assert sizer.rejected_requests == 1
+
+    sizer.update(sent=60, rejected=0, took=1000)
+    assert sizer.chunk_size == 30
+    assert sizer.concurrency == 1
+
+    for i in range(5):
+        sizer.update(sent=10, rejected=10, took=100)
+    assert sizer.chunk_size == 10
+    assert sizer.concurrency == 1
+    assert sizer.requests == 10
+
+
+def test_bulk_create_with_sizer(fix_model_bulk_save):
+    cls = fix_model_bulk_save
+
+    sizer = AdaptiveSizer(chunk_size=10, chunk_size_step=5)
+    models = [cls(value='sizer%s' % i) for i in range(100)]
+    result = cls.bulk_create(models, sizer=sizer, thread_count=2)
+
+    assert result.errors == []
+    assert sizer.actions == 100
+    assert sizer.chunk_size > 10
+
+
+class FailingBulkEs(object):
+    """
+    Fake elasticsearch client whose first ``failures`` _bulk requests
+    raise ``error``.
+    """
+
+    def __init__(self, error, failures=1):
+        self.transport = SimpleNamespace(serializer=JSONSerializer())
+        self.error = error
+        self.failures = failures
+        self.bodies = []
+
+    def bulk(self, body, **params):
+        self.bodies.append(body)
+        if len(self.bodies) <= self.failures:
+            raise self.error
+        lines = body.splitlines()
+        return {'took': 1,
+                'items': [{'index': {'_id': str(i), 'status': 201}}
+                          for i in range(len(lines) // 2)]}
+
+
+def test_bulk_writer_keeps_actions_on_error():
+    es = FailingBulkEs(ConnectionError('N/A', 'refused', None))
+    writer = BulkWriter(es, chunk_size=2)
+    writer.add(BulkSave(value='kept0'))
+    with pytest.raises(ConnectionError):
+        writer.add(BulkSave(value='kept1'))
+    assert writer.batches == 0
+
+    writer.add(BulkSave(value='kept2'))
+    writer.close()
+    assert writer.batches == 1
+    assert writer.docs == 3
+    assert len(es.bodies[-1].splitlines()) == 6
+
+
+def test_bulk_writer_exit_on_error():
+    es = FailingBulkEs(ConnectionError('N/A', 'refused', None))
+    with pytest.raises(ValueError):
+        with BulkWriter(es, flush_interval=60) as writer:
+            writer.add(BulkSave(value='kept'))
+            raise ValueError('body failed')
+    assert es.bodies == []
+    assert writer._timer is None
+
+    with pytest.raises(ConnectionError):
+        writer.flush()
+    writer.flush()
+    assert writer.batches == 1
+    assert writer.docs == 1
+
+
+def test_bulk_writer_timer_retries_on_error():
+    es = FailingBulkEs(ConnectionError('N/A', 'refused', None))
+    with BulkWriter(es, flush_interval=0.05) as writer:
+        writer.add(BulkSave(value='timer'))
+        time.sleep(0.3)
+        assert len(es.bodies) >= 2
+        assert writer.batches == 1
+
+
+def test_send_chunk_retries_rejected_request():
+    es = FailingBulkEs(TransportError(429, 'es_rejected_execution_exception'))
+    sizer = AdaptiveSizer(chunk_size=100)
+    chunk = [BulkSave(value='rejected')._bulk_action()]
+
+    result = send_chunk(es, chunk, initial_backoff=0.01, sizer=sizer)
+    assert result.errors == []
+    assert result.requests == 1
+    assert len(es.bodies) == 2
+    assert sizer.rejected_requests == 1
+    assert sizer.retries == 1
+
+    es = FailingBulkEs(TransportError(429, 'es_rejected_execution_exception'),
+                       failures=10)
+    with pytest.raises(TransportError):
+        send_chunk(es, chunk, max_retries=2, initial_backoff=0.01)
+    assert len(es.bodies) == 3
+
+
+class RejectingItemsBulkEs(object):
+    """
+    Fake elasticsearch client rejecting the actions of models with ids
+    in ``rejected`` with item status 429 the first time they are sent.
+    """
+
+    def __init__(self, rejected):
+        self.transport = SimpleNamespace(serializer=JSONSerializer())
+        self.rejected = set(rejected)
+        self.bodies = []
+
+    def bulk(self, body, **params):
+        self.bodies.append(body)
+        items = []
+        for line in body.splitlines()[::2]:
+            op_type, header = self.transport.serializer.loads(line).popitem()
+            id = header['_id']
+            if id in self.rejected:
+                self.rejected.remove(id)
+                items.append({op_type: {
+                    '_id': id, 'status': 429,
+                    'error': {'type': 'es_rejected_execution_exception'}}})
+            else:
+                items.append({op_type: {'_id': id, 'status': 200}})
+        return {'took': 1, 'items': items}
+
+
+def test_send_chunk_retries_rejected_items():
+    es = RejectingItemsBulkEs(rejected=['1', '3'])
+    sizer = AdaptiveSizer(chunk_size=100)
+    chunk = [BulkSave(id=str(i), value='mixed')._bulk_action(create=True)
+             for i in range(4)]
+
+    result = send_chunk(es, chunk, initial_backoff=0.01, sizer=sizer)
+    assert result.errors == []
+    assert result.requests == 2
+    assert [model.id for model in result] == ['0', '1', '2', '3']
+
+    serializer = es.transport.serializer
+    resent = [serializer.loads(line)['create']['_id']
+              for line in es.bodies[1].splitlines()[::2]]
+    assert resent == ['1', '3']
+    assert sizer.rejections == 2
+    assert sizer.rejected_requests == 1
+    assert sizer.retries == 1
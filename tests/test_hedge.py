@@ -0,0 +1,84 @@
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+from elastic_connect.hedge import Hedger
+
+
+def make_es(nodes=2):
+    pool = SimpleNamespace(connections=list(range(nodes)))
+    return SimpleNamespace(transport=SimpleNamespace(connection_pool=pool))
+
+
+def make_hedger():
+    hedger = Hedger(percentile=50, min_delay=0.01)
+    hedger.min_samples = 1
+    hedger._record(0.01)
+    return hedger
+
+
+def test_hedger_not_hedging_fast():
+    hedger = make_hedger()
+
+    assert hedger.call(make_es(), lambda **kw: kw, {'id': 1}) == {'id': 1}
+    assert hedger.stats()['requests'] == 1
+    assert hedger.stats()['sent'] == 0
+
+
+def test_hedger_hedge_wins():
+    hedger = make_hedger()
+    calls = itertools.count()
+
+    def search(**kw):
+        if next(calls) == 0:
+            time.sleep(1)
+            return 'primary'
+        return 'hedge'
+
+    start = time.monotonic()
+    assert hedger.call(make_es(), search, {}) == 'hedge'
+    assert time.monotonic() - start < 0.5
+    assert hedger.stats()['sent'] == 1
+    assert hedger.stats()['won'] == 1
+
+
+def test_hedger_single_node():
+    hedger = make_hedger()
+
+    def search(**kw):
+        time.sleep(0.05)
+        return 'primary'
+
+    assert hedger.call(make_es(nodes=1), search, {}) == 'primary'
+    assert hedger.stats()['sent'] == 0
+
+
+def test_hedger_no_free_worker():
+    hedger = Hedger(percentile=50, min_delay=0.01, max_workers=1)
+    hedger.min_samples = 1
+    hedger._record(0.01)
+    calls = itertools.count()
+
+    def search(**kw):
+        if next(calls) == 0:
+            time.sleep(0.1)
+            return 'primary'
+        return 'hedge'
+
+    # the only worker sends the primary request, there is none left for
+    # the hedge
+    assert hedger.call(make_es(), search, {}) == 'primary'
+    assert hedger.stats()['sent'] == 0
+
+
+def test_hedger_busy_runs_inline():
+    hedger = Hedger(percentile=50, min_delay=0.01, max_workers=1)
+    hedger.min_samples = 1
+    hedger._record(0.01)
+    hedger._free_workers.acquire()
+
+    def search(**kw):
+        return threading.current_thread()
+
+    assert hedger.call(make_es(), search, {}) is threading.current_thread()
+    assert hedger.stats()['sent'] == 0
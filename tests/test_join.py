@@ -1,7 +1,10 @@
+import asyncio
 import pytest
 from elastic_connect.base_model import Model
+from elastic_connect.save_plan import SavePlan
 from elastic_connect.data_types import Keyword, SingleJoin, MultiJoin, SingleJoinLoose, MultiJoinLoose
 import elastic_connect
+import elastic_connect.namespace
 
 
 class Parent(Model):
@@ -730,3 +733,201 @@ def test_multi_join_unloaded_resave(fix_id_one_many_with_reference):
     assert len(loaded.many) == 2
     assert loaded.many[0].id == many1.id
     assert loaded.many[1].id == many2.id
+
+
+def test_single_join_prefetch(fix_parent_child):
+    child1 = Child.create(value='child_prefetch1')  # type: Child
+    child2 = Child.create(value='child_prefetch2')  # type: Child
+    Parent.create(value='parent_prefetch', child=child1)
+    Parent.create(value='parent_prefetch', child=child2)
+    Parent.create(value='parent_prefetch')
+
+    Parent.refresh()
+    Child.refresh()
+
+    found = Parent.find_by(value='parent_prefetch', prefetch=['child'])
+    assert len(found) == 3
+    children = sorted(p.child.id for p in found if p.child)
+    assert children == sorted([child1.id, child2.id])
+    assert len([p for p in found if p.child is None]) == 1
+
+
+def test_multi_join_prefetch(fix_one_many):
+    many1 = Many.create(value='many_prefetch1')  # type: Many
+    many2 = Many.create(value='many_prefetch2')  # type: Many
+    many3 = Many.create(value='many_prefetch3')  # type: Many
+    One.create(value='one_prefetch', many=[many1, many2])
+    One.create(value='one_prefetch', many=[many2, many3])
+
+    One.refresh()
+    Many.refresh()
+
+    found = One.find_by(value='one_prefetch')
+    found.prefetch('many', chunk_size=2)
+    loaded = {tuple(m.id for m in one.many) for one in found}
+    assert loaded == {(many1.id, many2.id), (many2.id, many3.id)}
+    for one in found:
+        for many in one.many:
+            assert isinstance(many, Many)
+
+
+def test_loose_join_prefetch(fix_user_key):
+    users = [User.create(value='pepa_prefetch') for i in range(3)]
+    for user in users[:2]:
+        for i in range(3):
+            Key.create(value='prefetch%s' % i, user=user)
+
+    User.refresh()
+    Key.refresh()
+
+    found = User.find_by(value='pepa_prefetch', prefetch=['key', 'keys'])
+    assert len(found) == 3
+    by_id = {user.id: user for user in found}
+    for user in users[:2]:
+        assert len(by_id[user.id].keys) == 3
+        assert by_id[user.id].key.id in [k.id for k in by_id[user.id].keys]
+    assert by_id[users[2].id].keys == []
+    assert by_id[users[2].id].key is None
+
+
+def test_multi_join_loose_not_limited(fix_user_key):
+    u = User.create(value='pepa_many')  # type: User
+    for i in range(150):
+        Key.create(value='many%s' % i, user=u)
+
+    User.refresh()
+    Key.refresh()
+
+    lu = User.get(u.id)  # type: User
+    lu._lazy_load()
+    assert len(lu.keys) == 150
+
+
+def test_multi_join_save_plan(fix_one_many_with_reference):
+    many = [ManyWithReference(value='plan%s' % i) for i in range(20)]
+    one = OneWithReference(value='plan_boss', many=many)  # type: OneWithReference
+
+    plan = SavePlan(one)
+    assert plan.models[-1] is one
+    assert len(plan.models) == 21
+
+    plan.execute()
+    assert one.id is not None
+    assert all(m.id is not None for m in many)
+    assert one.get_dirty_fields() == set()
+
+    OneWithReference.refresh()
+    ManyWithReference.refresh()
+
+    loaded = OneWithReference.get(one.id)
+    loaded._lazy_load()
+    assert sorted(m.id for m in loaded.many) == sorted(m.id for m in many)
+    for lm in loaded.many:
+        lm._lazy_load()
+        assert lm.one.id == one.id
+
+
+def test_single_join_save_plan_existing(fix_parent_child):
+    parent = Parent.create(value='plan_parent')  # type: Parent
+    parent.child = Child(value='plan_child')
+    parent.save()
+
+    assert parent.child.id is not None
+    Parent.refresh()
+    Child.refresh()
+
+    loaded = Parent.get(parent.id)
+    loaded._lazy_load()
+    assert loaded.child.id == parent.child.id
+    assert loaded.child.value == 'plan_child'
+
+
+@pytest.mark.skipif(elastic_connect.namespace.AsyncElasticsearch is None,
+                    reason="no async elasticsearch client installed")
+def test_multi_join_loose_not_limited_async(fix_user_key):
+    u = User.create(value='pepa_many_async')  # type: User
+    for i in range(150):
+        Key.create(value='many_async%s' % i, user=u)
+
+    User.refresh()
+    Key.refresh()
+
+    async def run():
+        try:
+            lu = await User.aget(u.id)  # type: User
+            await lu._alazy_load()
+            return lu
+        finally:
+            await elastic_connect._namespaces['_default'].aclose()
+
+    lu = asyncio.run(run())
+    assert len(lu.keys) == 150
+    assert lu.key.id in [k.id for k in lu.keys]
+
+
+def test_bulk_create_save_plan(fix_one_many_with_reference, monkeypatch):
+    ones = [OneWithReference(value='bulk_plan%s' % i,
+                             many=[ManyWithReference(value='bulk_plan%s_%s' % (i, j))
+                                   for j in range(3)])
+            for i in range(5)]
+
+    plan = SavePlan(*ones)
+    assert len(plan.models) == 20
+    assert plan.models[-1] is ones[-1]
+
+    es = OneWithReference._es_namespace.get_es()
+    bulk = es.bulk
+    requests = []
+
+    def counting_bulk(**kwargs):
+        requests.append(kwargs)
+        return bulk(**kwargs)
+
+    monkeypatch.setattr(es, 'bulk', counting_bulk)
+    result = OneWithReference.bulk_create(ones)
+    assert result.errors == []
+    # the roots, then all the children, then the references of the roots
+    assert len(requests) == 3
+
+    OneWithReference.refresh()
+    ManyWithReference.refresh()
+    for one in ones:
+        loaded = OneWithReference.get(one.id)
+        loaded._lazy_load()
+        assert sorted(m.id for m in loaded.many) == sorted(m.id for m in one.many)
+
+
+def test_save_many_existing_with_new_join(fix_parent_child):
+    parent = Parent.create(value='save_many_parent')  # type: Parent
+    parent.child = Child(value='save_many_child')
+
+    result = Parent.save_many([parent])
+    assert result.errors == []
+    assert parent.child.id is not None
+    assert parent.get_dirty_fields() == set()
+
+    Parent.refresh()
+    Child.refresh()
+    loaded = Parent.get(parent.id)
+    loaded._lazy_load()
+    assert loaded.child.id == parent.child.id
+    assert loaded.child.value == 'save_many_child'
+
+
+def test_bulk_writer_existing_with_new_join(fix_one_many_with_reference):
+    one = OneWithReference.create(value='writer_one')  # type: OneWithReference
+    one.many = [ManyWithReference(value='writer_many%s' % i) for i in range(3)]
+
+    with OneWithReference.bulk_writer() as writer:
+        writer.add(one)
+    assert writer.errors == 0
+    assert all(m.id is not None for m in one.many)
+
+    OneWithReference.refresh()
+    ManyWithReference.refresh()
+    loaded = OneWithReference.get(one.id)
+    loaded._lazy_load()
+    assert sorted(m.id for m in loaded.many) == sorted(m.id for m in one.many)
+    for lm in loaded.many:
+        lm._lazy_load()
+        assert lm.one.id == one.id
@@ -1,8 +1,11 @@
+import asyncio
 import pytest
 from elastic_connect import Model
 import elastic_connect
+import elastic_connect.namespace
 from elastic_connect.data_types import Keyword, Long
 import elasticsearch.exceptions
+from elastic_connect.cache import LRUCache
 
 
 @pytest.fixture(scope="module")
@@ -547,3 +550,373 @@ def test_find_by_query(fix_model_two_save):
 
     found1 = cls.find_by(query="subvalue: *.zive.cz AND value: *50")
     assert len(found1) == 0
+
+
+def test_find_by_lazy_hydration(fix_model_one_save):
+    cls = fix_model_one_save
+
+    instance1 = cls.create(value='value_lazy')  # type: OneSave
+    instance2 = cls.create(value='value_lazy')  # type: OneSave
+    cls.refresh()
+
+    found = cls.find_by(value='value_lazy')
+    assert len(found) == 2
+    assert sorted(found.ids) == sorted([instance1.id, instance2.id])
+    assert found._models == [None, None]
+
+    assert found[1] is found[1]
+    assert found._models[0] is None
+
+    assert [f.id for f in found] == found.ids
+    assert found[0] is found._models[0]
+
+
+def test_iter_all(fix_model_two_save):
+    cls = fix_model_two_save
+
+    for i in range(25):
+        cls.create(value='value_iter', subvalue='iter%s' % (i % 2))
+    cls.refresh()
+
+    found = list(cls.iter_find_by(value='value_iter', page_size=10))
+    assert len(found) == 25
+    assert len(set(f.id for f in found)) == 25
+
+    found = list(cls.iter_find_by(value='value_iter', subvalue='iter1',
+                                  page_size=4))
+    assert len(found) == 12
+
+    found = list(cls.iter_all(query={'subvalue': 'iter0'}, page_size=3))
+    assert len(found) == 13
+
+    assert len(list(cls.iter_all(page_size=7))) >= 25
+
+
+def test_iter_all_close(fix_model_two_save, monkeypatch):
+    cls = fix_model_two_save
+
+    for i in range(5):
+        cls.create(value='value_iter_close')
+    cls.refresh()
+
+    es = cls._es_namespace.get_es()
+    clear_scroll = es.clear_scroll
+    cleared = []
+
+    def counting_clear_scroll(scroll_id, **kwargs):
+        cleared.append(scroll_id)
+        return clear_scroll(scroll_id=scroll_id, **kwargs)
+
+    monkeypatch.setattr(es, 'clear_scroll', counting_clear_scroll)
+
+    iterator = cls.iter_find_by(value='value_iter_close', page_size=2)
+    next(iterator)
+    assert cleared == []
+    iterator.close()
+
+    assert len(cleared) == 1
+    with pytest.raises(elasticsearch.exceptions.NotFoundError):
+        es.scroll(scroll_id=cleared[0], scroll='1m')
+
+
+def test_find_by_defer(fix_model_two_save):
+    cls = fix_model_two_save
+
+    for i in range(3):
+        cls.create(value='value_defer', subvalue='sub%s' % i)
+    cls.refresh()
+
+    found = cls.find_by(value='value_defer', defer=['subvalue'])
+    assert len(found) == 3
+    assert found[0].value == 'value_defer'
+    assert found[0].serialize(exclude=[]).keys() == {'id', 'value'}
+    assert sorted(f.subvalue for f in found) == ['sub0', 'sub1', 'sub2']
+
+    # saving a partially loaded model keeps the fields not loaded
+    found = cls.find_by(value='value_defer', only=['value'])
+    model = found[0]
+    model.value = 'value_defer_saved'
+    model.save()
+    loaded = cls.get(model.id)
+    assert loaded.value == 'value_defer_saved'
+    assert loaded.subvalue.startswith('sub')
+    assert model.subvalue == loaded.subvalue
+
+
+def test_save_dirty_fields(fix_model_two_save):
+    cls = fix_model_two_save
+
+    instance = cls(value='value_dirty', subvalue='sub')
+    assert instance.get_dirty_fields() == {'id', 'value', 'subvalue'}
+    instance.save()
+    assert instance.get_dirty_fields() == set()
+
+    loaded = cls.get(instance.id)
+    assert loaded.get_dirty_fields() == set()
+    loaded.value = 'value_dirty_changed'
+    assert loaded.get_dirty_fields() == {'value'}
+    assert loaded._save_request() == (
+        'update', {'id': instance.id,
+                   'body': {'doc': {'value': 'value_dirty_changed'}}})
+
+    # only the changed field is sent, not overwriting changes made
+    # behind the model's back
+    es = elastic_connect.get_es()
+    es.update(index=cls.get_index(), doc_type=cls.get_doctype(),
+              id=instance.id, body={'doc': {'subvalue': 'sub_changed'}})
+    loaded.save()
+    assert loaded.get_dirty_fields() == set()
+    assert loaded._save_request() == (None, None)
+
+    found = cls.get(instance.id)
+    assert found.value == 'value_dirty_changed'
+    assert found.subvalue == 'sub_changed'
+
+
+def test_to_columns(fix_model_one_save_sort):
+    cls = fix_model_one_save_sort
+
+    for i in range(5):
+        cls.create(value='value_columns', order=i)
+    cls.refresh()
+
+    found = cls.find_by(value='value_columns', sort=[{'order': 'asc'}])
+    columns = found.to_columns(['id', 'order'])
+    assert columns['id'] == found.ids
+    assert columns['order'] == [0, 1, 2, 3, 4]
+
+    pages = list(cls.iter_columns(['order'], query={'value': 'value_columns'},
+                                  page_size=2))
+    assert len(pages) == 3
+    assert sorted(o for page in pages for o in page['order']) == \
+        [0, 1, 2, 3, 4]
+
+    numpy = pytest.importorskip('numpy')
+    columns = found.to_columns(['order'], as_numpy=True)
+    assert columns['order'].dtype == numpy.int64
+    assert columns['order'].sum() == 10
+
+
+def test_parallel_scan(fix_model_two_save):
+    cls = fix_model_two_save
+
+    for i in range(30):
+        cls.create(value='value_scan', subvalue='scan%s' % (i % 3))
+    cls.refresh()
+
+    progress = {}
+
+    def report(slice_id, scanned, total):
+        progress[slice_id] = scanned
+
+    found = list(cls.parallel_scan(slices=3, query={'value': 'value_scan'},
+                                   page_size=4, progress=report))
+    assert len(found) == 30
+    assert len(set(f.id for f in found)) == 30
+    assert sorted(progress.keys()) == [0, 1, 2]
+    assert sum(progress.values()) == 30
+
+    slices = cls.iter_slices(2, query={'value': 'value_scan'}, page_size=4)
+    assert len(slices) == 2
+    found = [f.id for s in slices for f in s]
+    assert len(set(found)) == 30
+
+
+@pytest.fixture(scope="module")
+def fix_model_cached(request):
+
+    class Cached(Model):
+        __slots__ = ('value', )
+
+        _meta = {
+            '_doc_type': 'model_cached',
+            '_cache': {'ttl': 60, 'max_size': 1, 'negative_ttl': 60},
+        }
+        _mapping = {
+            'id': Keyword(name='id'),
+            'value': Keyword(name='value')
+        }
+
+    es = elastic_connect.get_es()
+    indices = elastic_connect.create_mappings(model_classes=[Cached])
+
+    yield Cached
+
+    if request.config.getoption("--index-noclean"):
+        print("** not cleaning")
+        return
+
+    elastic_connect.delete_indices(indices=indices)
+    assert not es.indices.exists(index=Cached.get_index())
+
+
+def test_get_cached(fix_model_cached):
+    cls = fix_model_cached
+    cache = cls.get_cache()
+
+    instance = cls.create(value='cached')
+    assert cls.get(instance.id).value == 'cached'
+    assert cache.stats()['misses'] == 1
+
+    # served from cache, even though changed behind the model's back
+    es = elastic_connect.get_es()
+    es.update(index=cls.get_index(), doc_type=cls.get_doctype(),
+              id=instance.id, body={'doc': {'value': 'changed'}})
+    assert cls.get(instance.id).value == 'cached'
+    assert cls.get([instance.id])[0].value == 'cached'
+    assert cache.stats()['hits'] == 2
+
+    # invalidated by save
+    instance.value = 'saved'
+    instance.save()
+    assert cls.get(instance.id).value == 'saved'
+
+    # negative caching
+    with pytest.raises(elasticsearch.exceptions.NotFoundError):
+        cls.get('cached_missing')
+    with pytest.raises(elasticsearch.exceptions.NotFoundError):
+        cls.get('cached_missing')
+    cls.create(id='cached_missing', value='created')
+    assert cls.get('cached_missing').value == 'created'
+    assert cache.stats()['evictions'] >= 1
+
+    instance.delete()
+    with pytest.raises(elasticsearch.exceptions.NotFoundError):
+        cls.get(instance.id)
+
+
+def test_get_cached_not_shared(fix_model_cached):
+    cls = fix_model_cached
+
+    instance = cls.create(value=['a'])
+    loaded = cls.get(instance.id)
+    loaded.value.append('b')
+    assert cls.get(instance.id).value == ['a']
+
+    cls.get([instance.id])[0].value.append('c')
+    assert cls.get([instance.id])[0].value == ['a']
+    assert cls.get(instance.id).value == ['a']
+
+
+def test_get_cached_missing(fix_model_cached):
+    cls = fix_model_cached
+
+    instance = cls.create(value='cached_present')
+    for i in range(2):
+        # the second time served from the cache
+        found = cls.get([instance.id, 'cached_missing_many'])
+        assert found.ids == [instance.id]
+        assert found.to_columns(['value']) == {'value': ['cached_present']}
+
+
+@pytest.mark.skipif(elastic_connect.namespace.AsyncElasticsearch is None,
+                    reason="no async elasticsearch client installed")
+def test_aget_cached(fix_model_cached):
+    cls = fix_model_cached
+    cache = cls.get_cache()
+
+    instance = cls.create(value='acached')
+
+    async def run():
+        try:
+            misses = cache.stats()['misses']
+            assert (await cls.aget(instance.id)).value == 'acached'
+            assert cache.stats()['misses'] == misses + 1
+            hits = cache.stats()['hits']
+            assert (await cls.aget(instance.id)).value == 'acached'
+            assert (await cls.aget([instance.id]))[0].value == 'acached'
+            assert cache.stats()['hits'] == hits + 2
+        finally:
+            await elastic_connect._namespaces['_default'].aclose()
+
+    asyncio.run(run())
+
+
+def test_lru_cache_refresh_after_invalidate():
+    cache = LRUCache(ttl=0, stale_ttl=60)
+    cache.set('a', 1)
+    entry = cache.get('a')
+    assert entry.stale
+
+    refreshed = cache.begin_refresh('a')
+    assert refreshed is entry
+    assert cache.begin_refresh('a') is None
+    cache.invalidate('a')
+    cache.set('a', 2, replace=refreshed)
+    assert cache.get('a') is None
+
+    cache.set('a', 1)
+    refreshed = cache.begin_refresh('a')
+    cache.set('a', 3, replace=refreshed)
+    assert cache.get('a').value == 3
+
+
+@pytest.fixture(scope="module")
+def fix_model_query_cached(request):
+
+    class QueryCached(Model):
+        __slots__ = ('value', )
+
+        _meta = {
+            '_doc_type': 'model_query_cached',
+            '_query_cache': {'ttl': 60, 'max_size': 10},
+        }
+        _mapping = {
+            'id': Keyword(name='id'),
+            'value': Keyword(name='value')
+        }
+
+    es = elastic_connect.get_es()
+    indices = elastic_connect.create_mappings(model_classes=[QueryCached])
+
+    yield QueryCached
+
+    if request.config.getoption("--index-noclean"):
+        print("** not cleaning")
+        return
+
+    elastic_connect.delete_indices(indices=indices)
+    assert not es.indices.exists(index=QueryCached.get_index())
+
+
+def test_find_by_query_cached(fix_model_query_cached):
+    cls = fix_model_query_cached
+    cache = cls.get_query_cache()
+
+    cls.create(value='query_cached')
+    cls.refresh()
+    assert len(cls.find_by(value='query_cached')) == 1
+    assert cache.stats()['misses'] == 1
+
+    # served from cache, even though changed behind the model's back
+    es = elastic_connect.get_es()
+    es.index(index=cls.get_index(), doc_type=cls.get_doctype(),
+             body={'value': 'query_cached'}, refresh=True)
+    assert len(cls.find_by(value='query_cached')) == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['bytes'] > 0
+
+    # invalidated by refresh
+    cls.refresh()
+    assert len(cls.find_by(value='query_cached')) == 2
+
+    # invalidated by create
+    es.indices.refresh(index=cls.get_index())
+    assert len(cls.find_by(value='query_cached')) == 2
+    cls.create(value='query_cached')
+    es.indices.refresh(index=cls.get_index())
+    assert len(cls.find_by(value='query_cached')) == 3
+
+
+def test_find_by_query_cached_not_shared(fix_model_query_cached):
+    cls = fix_model_query_cached
+
+    cls.create(value=['query_shared', 'a'])
+    cls.refresh()
+
+    found = cls.find_by(value='query_shared')
+    found[0].value.append('b')
+    assert cls.find_by(value='query_shared')[0].value == ['query_shared', 'a']
+    found = cls.find_by(value='query_shared')
+    found[0].value.append('c')
+    assert cls.find_by(value='query_shared')[0].value == ['query_shared', 'a']
@@ -2,6 +2,8 @@ import pytest
 import elastic_connect
 from elastic_connect import Model
 from elastic_connect.data_types import Keyword
+from elastic_connect.pool import PooledHttpConnection
+from elasticsearch.connection import Urllib3HttpConnection
 
 
 @pytest.fixture()
@@ -161,3 +163,143 @@ def test_namespace_save(fix_model_one_save, fix_model_two_save):
     assert loaded2.value == 'value2'
     print("instance1", instance1)
     print("instance2", instance2)
+
+
+def test_session_identity_map(fix_model_one_save):
+    cls = fix_model_one_save
+    namespace = cls._es_namespace
+
+    instance = cls.create(value='session')
+    cls.refresh()
+
+    assert cls.get(instance.id) is not cls.get(instance.id)
+
+    with namespace.session() as session:
+        loaded = cls.get(instance.id)
+        assert cls.get(instance.id) is loaded
+        assert cls.get([instance.id])[0] is loaded
+        assert cls.find_by(value='session')[0] is loaded
+
+        created = cls.create(value='session_created')
+        assert cls.get(created.id) is created
+
+        other = cls.create(value='session_other')
+        session.remove(other)
+        both = cls.get([instance.id, other.id])
+        assert isinstance(both, elastic_connect.Result)
+        assert both.ids == [instance.id, other.id]
+        assert both[0] is loaded
+        assert both[1].value == 'session_other'
+        assert cls.get([other.id])[0] is both[1]
+        assert both.to_columns(['value']) == {
+            'value': ['session', 'session_other']}
+
+        created.delete()
+        assert session.get(cls, created.id) is None
+
+    assert namespace.get_session() is None
+
+
+def test_namespace_pool_options():
+    default_namespace = elastic_connect._namespaces['_default']
+    pooled = elastic_connect.Namespace(name='pooled',
+                                       es_conf=default_namespace.es_conf,
+                                       maxsize=3, pool_block=True,
+                                       connect_timeout=1.0)
+    es = pooled.get_es()
+    connection = es.transport.connection_pool.connections[0]
+    assert connection.pool.pool.maxsize == 3
+    assert connection.pool.block
+    assert connection.pool.timeout.connect_timeout == 1.0
+
+    es.cluster.health()
+    stats = pooled.pool_stats()
+    assert stats['nodes'] == 1
+    assert stats['requests'] == 1
+    assert stats['in_use'] == 0
+    assert stats['idle'] == 1
+    assert stats['new_connections'] == 1
+
+
+def test_namespace_compress(namespace_model_index):
+    default_namespace = elastic_connect._namespaces['_default']
+    compressed = elastic_connect.Namespace(
+        name='compressed', es_conf=default_namespace.es_conf,
+        index_prefix=default_namespace._index_prefix, compress=True,
+        compress_threshold=100)
+    CompressedModel = compressed.register_model_class(NamespacedModel)
+    assert CompressedModel.get_index() == NamespacedModel.get_index()
+
+    value = 'compressed' * 100
+    instance = CompressedModel.create(value=value)
+    CompressedModel.refresh()
+
+    assert CompressedModel.get(instance.id).value == value
+    found = CompressedModel.find_by(value=value)
+    assert [model.id for model in found] == [instance.id]
+
+
+def test_compress_threshold_in_bytes(monkeypatch):
+    sent = []
+
+    def perform_request(self, method, url, params, body, timeout, ignore,
+                        headers):
+        sent.append((body, headers or {}))
+        return 200, {}, '{}'
+
+    monkeypatch.setattr(Urllib3HttpConnection, 'perform_request',
+                        perform_request)
+    connection = PooledHttpConnection(compress=True, compress_threshold=10)
+
+    # 6 characters, but 12 bytes
+    connection.perform_request('POST', '/_search', body='\u0159' * 6)
+    assert sent[-1][1].get('content-encoding') == 'gzip'
+
+    connection.perform_request('POST', '/_search', body='r' * 6)
+    assert sent[-1] == (b'r' * 6, {})
+
+
+def test_wait_for_ready():
+    default_namespace = elastic_connect._namespaces['_default']
+
+    times = elastic_connect.namespace.wait_for_ready([default_namespace],
+                                                     timeout=10.0)
+    assert list(times) == ['_default']
+    assert default_namespace.time_to_ready == times['_default']
+    assert times['_default'] < 10.0
+
+    health = default_namespace.wait_for_ready(timeout=10.0)
+    assert health['status'] in ('yellow', 'green')
+
+
+def test_wait_for_ready_timeout():
+    unreachable = elastic_connect.Namespace(
+        name='unreachable',
+        es_conf=[{'host': 'localhost', 'port': 1},
+                 {'host': 'localhost', 'port': 2}])
+
+    with pytest.raises(elastic_connect.namespace.NamespaceConnectionError):
+        unreachable.wait_for_http_connection(timeout=0.5)
+    assert unreachable.time_to_ready is None
+
+
+def test_wait_for_ready_initial_wait_in_timeout(monkeypatch):
+    timeouts = []
+
+    def probe(targets, status, timeout, initial_delay):
+        timeouts.append(timeout)
+        return {}
+
+    monkeypatch.setattr(elastic_connect.namespace.readiness, 'probe', probe)
+    namespace = elastic_connect.Namespace(
+        name='initial_wait', es_conf=[{'host': 'localhost', 'port': 1}])
+
+    with pytest.raises(elastic_connect.namespace.NamespaceConnectionError):
+        namespace.wait_for_ready(initial_attempt=False, initial_wait=0.2,
+                                 timeout=0.1)
+    assert timeouts == [0.0]
+
+    with pytest.raises(elastic_connect.namespace.NamespaceConnectionError):
+        namespace.wait_for_ready(initial_attempt=False, initial_wait=0.05,
+                                 timeout=1.0)
+    assert 0.0 < timeouts[1] <= 0.95
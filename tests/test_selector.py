@@ -0,0 +1,60 @@
+from elastic_connect.selector import LatencySelector, NodeStats, is_read
+
+
+class Node(object):
+    def __init__(self, latency=None, errors=0, requests=10):
+        self.node_stats = NodeStats()
+        for i in range(requests):
+            self.node_stats.record(latency or 0.0, i < errors)
+        if latency is None:
+            self.node_stats.latency = None
+
+
+def test_is_read():
+    assert is_read('GET', '/index/doc/1')
+    assert is_read('POST', '/index/_search')
+    assert is_read('POST', '/_search/scroll')
+    assert not is_read('POST', '/_bulk')
+    assert not is_read('PUT', '/index/doc/1')
+
+
+def test_latency_selector_prefers_fast():
+    fast, slow = Node(latency=0.01), Node(latency=0.02)
+    selector = LatencySelector({})
+    selector.explore = 0
+
+    assert all(selector.select([fast, slow]) is fast for i in range(20))
+    assert not slow.node_stats.is_ejected()
+
+
+def test_latency_selector_probes_unmeasured():
+    fast, new = Node(latency=0.01), Node(requests=0)
+    selector = LatencySelector({})
+    selector.explore = 0
+
+    assert selector.select([fast, new]) is new
+
+
+def test_latency_selector_ejects():
+    fast, slow = Node(latency=0.01), Node(latency=0.2)
+    failing = Node(latency=0.01, errors=10)
+    selector = LatencySelector({})
+
+    selected = {selector.select([fast, slow, failing]) for i in range(20)}
+    assert selected == {fast}
+    assert slow.node_stats.is_ejected()
+    assert failing.node_stats.is_ejected()
+    assert slow.node_stats.latency is None
+
+    slow.node_stats.ejected_until = 0
+    assert selector.select([slow]) is slow
+
+
+def test_latency_selector_keeps_one():
+    one, two = Node(errors=10), Node(errors=10)
+    selector = LatencySelector({})
+
+    assert selector.select([one, two]) in (one, two)
+    ejected = [one.node_stats.is_ejected(), two.node_stats.is_ejected()]
+    assert ejected.count(True) == 1
+    assert selector.select([one, two]) in (one, two)
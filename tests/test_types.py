@@ -118,4 +118,40 @@ def test_type_on_model(request, cls, value, loaded_val, es_val):
     except Exception as e:
         raise e
     finally:
-        clean_es_for_model(indices, cls, request)
\ No newline at end of file
+        clean_es_for_model(indices, cls, request)
+
+
+@pytest.mark.parametrize("cls, source", [
+    (KeywordModel, {'value': 'asdfasdf'}),
+    (KeywordModel, {}),
+    (DateModel, {'value': '2019-06-13T00:00:00'}),
+    (BooleanModel, {'value': False}),
+    (LongModel, {'value': 123}),
+])
+def test_type_hydrator(cls, source):
+    hit = {'_id': 'hydrated', '_source': source}
+
+    loaded = cls.from_es(hit)
+    expected = cls._hydrate_init(hit)
+
+    assert loaded.id == 'hydrated'
+    assert loaded.value == expected.value
+    assert loaded.serialize() == expected.serialize()
+
+
+@pytest.mark.parametrize("memo_size", [0, 2])
+@pytest.mark.parametrize("value, expected", [
+    ('2019-06-13T00:00:00', datetime.datetime(2019, 6, 13)),
+    ('2019-06-13T10:20:30.123456',
+     datetime.datetime(2019, 6, 13, 10, 20, 30, 123456)),
+    ('2019-06-13T10:20:30Z',
+     datetime.datetime(2019, 6, 13, 10, 20, 30,
+                       tzinfo=datetime.timezone.utc)),
+    ('13.6.2019', datetime.datetime(2019, 6, 13)),
+    (None, None),
+])
+def test_date_deserialize(value, expected, memo_size):
+    date = Date(name='value', memo_size=memo_size)
+
+    assert date.deserialize(value) == expected
+    assert date.deserialize(value) == expected